@@ -1,6 +1,41 @@
-import copy
 from a1_partc import Queue
 
+# Per-shape tables built by shape_tables, keyed on (rows, cols)
+_shape_tables = {}
+
+def shape_tables(rows, cols):
+    """
+    Returns the per-cell tables the overflow rules need for a grid shape.
+    
+    A cell overflows when its absolute value is greater than its capacity, which is
+    one less than its number of neighbors (1 in corners, 2 on edges, 3 inside).
+    Cells are numbered row by row, so cell (row, col) has index row * cols + col.
+    The tables are built the first time a shape is seen and shared by every later
+    call, so they must not be modified.
+    
+    Args:
+    rows (int): Number of rows of the grid.
+    cols (int): Number of columns of the grid.
+    
+    Returns:
+    Tuple[Tuple[int, ...], Tuple[Tuple[int, ...], ...]]: The capacity of every cell, and the
+                                                         indexes of every cell's neighbors
+                                                         (up, down, left, right).
+    """
+    tables = _shape_tables.get((rows, cols))
+    if tables is None:
+        capacity = []
+        neighbor_lists = []
+        for row in range(rows):
+            max_nbs = 2 if row in (0, rows - 1) else 3
+            for col in range(cols):
+                capacity.append(max_nbs - 1 if col in (0, cols - 1) else max_nbs)
+                neighbor_lists.append(tuple(y * cols + x for y, x in neighbors(row, col)
+                                            if 0 <= y < rows and 0 <= x < cols))
+        tables = (tuple(capacity), tuple(neighbor_lists))
+        _shape_tables[(rows, cols)] = tables
+    return tables
+
 def get_overflow_list(grid):
     """
     Identifies cells in the grid that are overflowing.
@@ -15,56 +50,148 @@ def get_overflow_list(grid):
     List[Tuple[int, int]] or None: A list of (row, column) coordinates of overflowing cells,
                                    or None if no cells are overflowing.
     """
+    cols = len(grid[0])
+    capacity, _ = shape_tables(len(grid), cols)
     coords = []
     for row_i, row in enumerate(grid):
-        max_nbs = 2 if row_i in (0, len(grid) - 1) else 3
+        offset = row_i * cols
         for col_i, value in enumerate(row):
-            tmp_max = max_nbs - 1 if col_i in (0, len(row) - 1) else max_nbs
-            if abs(value) > tmp_max:
+            if abs(value) > capacity[offset + col_i]:
                 coords.append((row_i, col_i))
     return coords or None
 
-def overflow(grid, a_queue, grids_added=0):
+def overflow(grid, a_queue, grids_added=0, deltas=False):
     """
     Simulates the overflow process on the grid.
     
-    This function recursively handles overflows until the grid stabilizes
-    or all cells have the same sign.
+    Each wave empties every overflowing cell and adds a piece to each of its
+    neighbors, which take the overflowing cell's sign. Waves repeat until the
+    grid stabilizes or all cells have the same sign.
+
+    Only cells touched by the last wave can start overflowing, so after the
+    first wave just those cells are checked, and the number of positive and
+    negative cells is kept up to date instead of rescanning the grid. The
+    waves run in a loop, so long cascades don't grow the call stack. They
+    work on a flat copy of the grid with the capacity and neighbor tables of
+    shape_tables (see overflow_flat), and the result is copied back into the
+    grid at the end.
+
+    With deltas set, each wave is enqueued as the list of (row, col, new value)
+    changes it made, in row-major order, instead of a copy of the whole grid.
+    Applying them in order with apply_delta replays the cascade.
     
     Args:
     grid (List[List[int]]): The initial grid state.
     a_queue (Queue): A queue to store each new grid state.
     grids_added (int): The number of grids added to the queue (default is 0).
+    deltas (bool): Enqueue per-wave changes instead of full grids (default is False).
     
     Returns:
     int: The number of grids added to the queue during the process.
     """
-    # Get the list of overflowing cells
-    overflow_cells = get_overflow_list(grid)
-    
-    # Check if there are overflowing cells and if the grid has different signs
-    if overflow_cells and not all_same_sign(grid):
-        signs = []  # Parallel list of the signs of overflowing cells
-        for y, x in overflow_cells:
-            signs.append(grid[y][x] // abs(grid[y][x]))
-            grid[y][x] = 0
-
-        # Update the neighbors of each overflowing cell
-        for i, (row, col) in enumerate(overflow_cells):
-            for y, x in neighbors(row, col):
-                if valid_coord(grid, y, x):
-                    grid[y][x] = (abs(grid[y][x]) + 1) * signs[i]
-        
+    rows = len(grid)
+    cols = len(grid[0])
+    capacity, neighbor_table = shape_tables(rows, cols)
+    cells = [value for row in grid for value in row]
+    size = len(cells)
+
+    # Count the cells of each sign once; the waves keep the counts up to date
+    counts = [0, 0, 0]
+    for value in cells:
+        if value > 0:
+            counts[1] += 1
+        elif value < 0:
+            counts[-1] += 1
+
+    def enqueue(touched, old_values):
         # Enqueue the new grid state
-        a_queue.enqueue(copy.deepcopy(grid))
+        nonlocal grids_added
+        if deltas:
+            delta = []
+            for i in touched:
+                if cells[i] != old_values[i]:
+                    y, x = divmod(i, cols)
+                    delta.append((y, x, cells[i]))
+            a_queue.enqueue(delta)
+        else:
+            a_queue.enqueue([cells[i:i + cols] for i in range(0, size, cols)])
         grids_added += 1
-        
-        # Recursively handle the next overflow
-        if get_overflow_list(grid):
-            grids_added += overflow(grid, a_queue)
-    
+
+    overflow_cells = [i for i in range(size) if abs(cells[i]) > capacity[i]]
+    if overflow_flat(cells, capacity, neighbor_table, overflow_cells, counts, enqueue):
+        for row_i, row in enumerate(grid):
+            row[:] = cells[row_i * cols:(row_i + 1) * cols]
     return grids_added
 
+def overflow_flat(cells, capacity, neighbor_table, overflow_cells, counts, on_wave=None):
+    """
+    Runs the overflow waves on a flat list of cells, in place. This is the kernel of
+    overflow, for code that keeps its own flat copy of a board, such as the rollouts
+    of mcts.py, so that every caller resolves overflow with the same rules.
+
+    Args:
+    cells (List[int]): Cell values in row-major order, changed in place.
+    capacity (Tuple[int, ...]): Capacity of every cell, from shape_tables.
+    neighbor_table (Tuple[Tuple[int, ...], ...]): Neighbor indexes of every cell, from shape_tables.
+    overflow_cells (List[int]): Indexes of the overflowing cells, in row-major order.
+    counts (List[int]): Number of positive cells at [1] and negative cells at [-1], kept up to date.
+    on_wave (Callable): Called after each wave with the indexes of the cells it changed, in
+                        row-major order, and a list giving the value each of them had before
+                        the wave, by index (default is None).
+
+    Returns:
+    int: The number of waves.
+    """
+    size = len(cells)
+    seen = [0] * size  # Wave number each cell was last touched in
+    old_values = [0] * size  # Value each cell had before the wave that last touched it
+    wave = 0
+    while overflow_cells and counts[1] and counts[-1]:
+        wave += 1
+        signs = []  # Parallel list of the signs of overflowing cells
+        touched = list(overflow_cells)  # Indexes of the cells changed by this wave
+        for i in overflow_cells:
+            seen[i] = wave
+            old_values[i] = cells[i]
+            sign = 1 if cells[i] > 0 else -1
+            signs.append(sign)
+            counts[sign] -= 1
+            cells[i] = 0
+
+        # Update the neighbors of each overflowing cell, in row-major order like get_overflow_list
+        for i, sign in zip(overflow_cells, signs):
+            for j in neighbor_table[i]:
+                value = cells[j]
+                if seen[j] != wave:
+                    seen[j] = wave
+                    old_values[j] = value
+                    touched.append(j)
+                if value > 0:
+                    counts[1] -= 1
+                elif value < 0:
+                    counts[-1] -= 1
+                counts[sign] += 1
+                cells[j] = (abs(value) + 1) * sign
+
+        touched.sort()
+        if on_wave is not None:
+            on_wave(touched, old_values)
+
+        # Only the touched cells can overflow in the next wave
+        overflow_cells = [i for i in touched if abs(cells[i]) > capacity[i]]
+    return wave
+
+def apply_delta(grid, delta):
+    """
+    Applies one wave of changes enqueued by overflow with deltas set.
+    
+    Args:
+    grid (List[List[int]]): The grid to update in place.
+    delta (List[Tuple[int, int, int]]): The (row, column, new value) changes of the wave.
+    """
+    for row, col, value in delta:
+        grid[row][col] = value
+
 def neighbors(row, col):
     """
     Returns the coordinates of the neighboring cells.
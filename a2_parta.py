@@ -1,37 +1,113 @@
+import mmap
+import os
+import struct
+import threading
+from array import array
+
+# Marks a slot whose record was removed. Lookups probe past it, and inserts can reuse it
+DELETED = object()
+
 class HashTable:
-	def __init__(self, initial_capacity=32):  # Initialize the HashTable with a default capacity of 32
+	# Number of old slots an incremental rehash moves over per operation
+	REHASH_STEP = 16
+
+	def __init__(self, initial_capacity=32, incremental=False):  # Initialize the HashTable with a default capacity of 32
 		self.cap = initial_capacity  # Set the capacity of the HashTable
 		self.my_list = [None] * self.cap  # Create an empty list of size equal to the capacity
+		self.count = 0  # Number of records in the HashTable
+		self.tombstones = 0  # Number of slots of my_list left by removed records
+		# With incremental set, a rehash allocates the new slot list and then moves REHASH_STEP old slots
+		# over on every operation, instead of reinserting every record at once
+		self.incremental = incremental
+		self.old_list = None  # Slot list still being moved into my_list by an incremental rehash, if any
+		self.old_cap = 0  # Capacity of old_list
+		self.old_index = 0  # Next slot of old_list to move
 
 	def insert(self, key, value):
+		self.rehash_step()  # Move part of an unfinished incremental rehash along
 		# Check if the key already exists in the HashTable
-		for i in range(self.cap):
-			if self.my_list[i] is not None and self.my_list[i][0] == key:
-				return False  # Key already exists, return False
-		
-		# Insert the key-value pair into the HashTable
-		self.just_insert(key, value)
-		
-		# Check the load factor and rehash if necessary
-		if len([slot for slot in self.my_list if slot is not None]) / self.cap > 0.7:
-			self.rehash_and_insert()  # Rehash the HashTable and insert the key-value pair
-		
+		index, free = self.probe(key)
+		if index is not None:
+			return False  # Key already exists, return False
+		if self.old_list is not None and self.probe_list(self.old_list, self.old_cap, key)[0] is not None:
+			return False  # Key exists in the slots not yet moved by the rehash, return False
+
+		# Insert the key-value pair into the first free slot of its probe sequence
+		if self.my_list[free] is DELETED:
+			self.tombstones -= 1  # Reusing a removed record's slot
+		self.my_list[free] = [key, value]
+		self.count += 1
+
+		# Check the load factor and rehash if necessary. Slots left by removals count too, as
+		# lookups have to probe past them
+		if (self.count + self.tombstones) / self.cap > 0.7:
+			if self.count / self.cap > 0.5:
+				self.rehash_and_insert()  # Rehash the HashTable into double the capacity
+			else:
+				self.rehash(self.cap)  # Mostly removed records: rehash at the same capacity to clear them out
+
 		return True  # Return True after successful insertion
 
 	def rehash_and_insert(self):
+		# Double the capacity of the HashTable and reinsert all elements
+		self.rehash(self.cap * 2)
+
+	def rehash(self, new_cap, incremental=None):
+		# Move the records into a new slot list of new_cap slots, incrementally if incremental is set
+		# (the table's own mode by default). Finish the last incremental rehash first, so there is only
+		# ever one old slot list
+		if incremental is None:
+			incremental = self.incremental
+		self.finish_rehash()
+
 		# Create a copy of the current list and capacity
 		copy_list = self.my_list
+		copy_cap = self.cap
 
-		# Double the capacity of the HashTable
-		self.cap *= 2
+		# Set the new capacity of the HashTable; removed records are dropped
+		self.cap = new_cap
 		self.my_list = [None] * self.cap
+		self.tombstones = 0
+
+		if incremental:
+			# Leave the records where they are for now; operations move them over a few slots at a time
+			self.old_list = copy_list
+			self.old_cap = copy_cap
+			self.old_index = 0
+			return
 
 		# Reinsert all elements from the copy list
+		self.count = 0
 		for item in copy_list:
-			if item is not None:
+			if item is not None and item is not DELETED:
 				key, value = item
 				self.just_insert(key, value)
 
+	def rehash_step(self, slots=None):
+		# Move up to slots (REHASH_STEP by default) slots of an incremental rehash into my_list
+		if self.old_list is None:
+			return
+		old_list = self.old_list
+		stop = min(self.old_index + (self.REHASH_STEP if slots is None else slots), self.old_cap)
+		for i in range(self.old_index, stop):
+			item = old_list[i]
+			if item is not None and item is not DELETED:
+				# Leave a tombstone so old keys probing past this slot are still found
+				old_list[i] = DELETED
+				index = self.probe_list(self.my_list, self.cap, item[0])[1]
+				if self.my_list[index] is DELETED:
+					self.tombstones -= 1
+				self.my_list[index] = item
+		self.old_index = stop
+		if stop == self.old_cap:
+			self.old_list = None  # Every record has been moved, so the old slot list can go
+			self.old_cap = 0
+
+	def finish_rehash(self):
+		# Move everything an incremental rehash has left in one go
+		if self.old_list is not None:
+			self.rehash_step(self.old_cap)
+
 	def just_insert(self, key, value):
 		hash_value = hash(key)  # Compute the hash value of the key
 		hash_index = hash_value % self.cap  # Compute the hash index using modulo operator
@@ -39,38 +115,654 @@ class HashTable:
 		# Linear probing to find an empty slot in the HashTable
 		for i in range(self.cap):
 			index = (hash_index + i) % self.cap
-			if self.my_list[index] is None:
+			slot = self.my_list[index]
+			if slot is None or slot is DELETED:
+				if slot is DELETED:
+					self.tombstones -= 1  # Reusing a removed record's slot
 				self.my_list[index] = [key, value]  # Insert the key-value pair into the empty slot
+				self.count += 1
 				break
 
+	def probe(self, key):
+		# Follow the key's probe sequence through my_list. Returns the index of the key's slot (None if not
+		# found) and the index of the first slot the key could be inserted in (None if found or no free slot)
+		return self.probe_list(self.my_list, self.cap, key)
+
+	@staticmethod
+	def probe_list(my_list, cap, key):
+		# Follow the key's probe sequence from hash(key) % cap until the key or an empty slot is found.
+		# Slots of removed records don't end the probe, since the key may have been placed past them
+		index = hash(key) % cap
+		free = None
+		for _ in range(cap):
+			slot = my_list[index]
+			if slot is None:
+				return None, index if free is None else free  # Key not found
+			if slot is DELETED:
+				if free is None:
+					free = index  # First reusable slot on the probe sequence
+			elif slot[0] == key:
+				return index, None  # Found the key
+			index = (index + 1) % cap
+		return None, free  # Probed every slot without finding the key
+
+	def find(self, key):
+		# Returns the slot list holding the key and the key's index in it, looking in the slots an
+		# incremental rehash hasn't moved yet too, or (None, None) if the key is not in the HashTable
+		self.rehash_step()  # Move part of an unfinished incremental rehash along
+		index, _ = self.probe(key)
+		if index is not None:
+			return self.my_list, index
+		if self.old_list is not None:
+			index, _ = self.probe_list(self.old_list, self.old_cap, key)
+			if index is not None:
+				return self.old_list, index
+		return None, None
+
 	def modify(self, key, value):
-		for i in range(self.cap):
-			slot = self.my_list[i]
-			if slot is not None and slot[0] == key:
-				self.my_list[i][1] = value  # Modify the value associated with the key
-				return True  # Return True after successful modification
+		slots, index = self.find(key)
+		if slots is not None:
+			slots[index][1] = value  # Modify the value associated with the key
+			return True  # Return True after successful modification
 		return False  # Key not found, return False
 
 	def remove(self, key):
-		for i in range(self.cap):
-			slot = self.my_list[i]
-			if slot is not None and slot[0] == key:
-				self.my_list[i] = None  # Remove the key-value pair from the HashTable
-				return True  # Return True after successful removal
+		slots, index = self.find(key)
+		if slots is not None:
+			slots[index] = DELETED  # Remove the key-value pair, leaving a tombstone so later probes continue past it
+			self.count -= 1
+			if slots is self.my_list:
+				self.tombstones += 1  # Tombstones in the old slot list go away with it
+			return True  # Return True after successful removal
 		return False  # Key not found, return False
 
 	def search(self, key):
-		for i in range(self.cap):
-			slot = self.my_list[i]
-			if slot is not None and slot[0] == key:
-				return slot[1]  # Return the value associated with the key
+		slots, index = self.find(key)
+		if slots is not None:
+			return slots[index][1]  # Return the value associated with the key
 		return None  # Key not found, return None
 
+	@classmethod
+	def from_items(cls, items, initial_capacity=32, incremental=False):
+		# Build a HashTable from (key, value) pairs, with the slot list allocated once at the capacity
+		# inserting them one by one would have ended at. Like update, a later pair replaces the value of
+		# an earlier pair with the same key
+		items = items if hasattr(items, '__len__') else list(items)
+		table = cls(cls.capacity_for(len(items), initial_capacity), incremental)
+		table.update(items)
+		return table
+
+	@staticmethod
+	def capacity_for(records, capacity=32):
+		# Capacity a table starting at capacity doubles to while inserting records, the first one at
+		# which records / capacity is at most 0.7
+		while records / capacity > 0.7:
+			capacity *= 2
+		return capacity
+
+	def reserve(self, records):
+		# Resize the HashTable once, if needed, so that it can hold records records without resizing.
+		# The rehash is done in full even in incremental mode, and clears out removed records' slots
+		self.finish_rehash()
+		new_cap = self.capacity_for(records, self.cap)
+		if new_cap != self.cap or (records + self.tombstones) / self.cap > 0.7:
+			self.rehash(new_cap, incremental=False)
+
+	def update(self, items):
+		# Insert (key, value) pairs in one pass, replacing the value of keys already in the HashTable.
+		# The table is sized for all of them first. Returns the number of new records
+		items = items if hasattr(items, '__len__') else list(items)
+		self.reserve(self.count + len(items))
+		my_list = self.my_list
+		added = 0
+		for key, value in items:
+			index, free = self.probe(key)
+			if index is not None:
+				my_list[index][1] = value  # Key already exists: replace its value
+				continue
+			if my_list[free] is DELETED:
+				self.tombstones -= 1  # Reusing a removed record's slot
+			my_list[free] = [key, value]
+			added += 1
+		self.count += added
+		return added
+
+	def get_many(self, keys, default=None):
+		# Look up a batch of keys. Returns their values in the same order, default for missing keys
+		find = self.find
+		values = []
+		for key in keys:
+			slots, index = find(key)
+			values.append(default if slots is None else slots[index][1])
+		return values
+
+	def items(self):
+		# Yield every (key, value) record, including those an incremental rehash hasn't moved yet
+		for slots in (self.my_list, self.old_list or ()):
+			for slot in slots:
+				if slot is not None and slot is not DELETED:
+					yield slot[0], slot[1]
+
+	def save(self, path, tag=0):
+		# Write the records to a file MappedHashTable can open. Keys must be unsigned and values signed
+		# 64-bit integers
+		MappedHashTable.write(path, self.items(), len(self), tag)
+
+	def probe_stats(self):
+		# Returns the longest and the mean number of slots a successful search looks at, over every record
+		# of my_list (records an incremental rehash hasn't moved yet are not counted)
+		cap = self.cap
+		lengths = [(i - hash(slot[0]) % cap) % cap + 1 for i, slot in enumerate(self.my_list)
+			if slot is not None and slot is not DELETED]
+		return (max(lengths), sum(lengths) / len(lengths)) if lengths else (0, 0.0)
+
 	def count_occupied_slots(self):
-		return len([slot for slot in self.my_list if slot is not None])  # Count the number of occupied slots in the HashTable
+		return self.count  # Number of records in the HashTable, kept up to date by every operation
 
 	def capacity(self):
 		return self.cap  # Return the total capacity of the HashTable
 
 	def __len__(self):
-		return self.count_occupied_slots()  # Return the number of occupied slots in the HashTable
\ No newline at end of file
+		return self.count_occupied_slots()  # Return the number of occupied slots in the HashTable
+
+# Slot states of the array-backed tables
+EMPTY = 0  # Never used since the last rehash: ends a probe
+FULL = 1  # Holds a record
+REMOVED = 2  # Held a record that was removed: probes continue past it
+
+class CompactHashTable:
+	# Same interface and resizing as HashTable, but records are kept in parallel arrays instead of a
+	# [key, value] list per slot: a byte of state, the cached hash, the key and the value of each slot.
+	# Rehashing reuses the cached hashes instead of calling hash() again
+	def __init__(self, initial_capacity=32):  # Initialize the table with a default capacity of 32
+		self.cap = initial_capacity  # Set the capacity of the table
+		self.count = 0  # Number of records in the table
+		self.tombstones = 0  # Number of slots left by removed records
+		self.allocate(self.cap)  # Create empty slot arrays of size equal to the capacity
+
+	def allocate(self, cap):
+		# Create the slot arrays for a capacity, every slot EMPTY
+		self.states = bytearray(cap)  # EMPTY, FULL or REMOVED
+		self.hashes = array('q', bytes(8 * cap))  # hash(key) of each record
+		self.keys = [None] * cap
+		self.values = [None] * cap
+
+	def clear_slot(self, index):
+		# Drop the references a removed record's slot holds, so they can be freed
+		self.keys[index] = None
+		self.values[index] = None
+
+	def probe(self, key, hash_value):
+		# Follow the key's probe sequence from hash_value % cap until the key or an EMPTY slot is found.
+		# Returns the index of the key's slot (None if not found) and the index of the first slot the
+		# key could be inserted in (None if found or no free slot)
+		states = self.states
+		hashes = self.hashes
+		keys = self.keys
+		cap = self.cap
+		index = hash_value % cap
+		free = None
+		for _ in range(cap):
+			state = states[index]
+			if state == EMPTY:
+				return None, index if free is None else free  # Key not found
+			if state == REMOVED:
+				if free is None:
+					free = index  # First reusable slot on the probe sequence
+			elif hashes[index] == hash_value and keys[index] == key:
+				return index, None  # Found the key; comparing the cached hashes first skips most key compares
+			index += 1
+			if index == cap:
+				index = 0
+		return None, free  # Probed every slot without finding the key
+
+	def insert(self, key, value):
+		hash_value = hash(key)  # Compute the hash value of the key once
+		index, free = self.probe(key, hash_value)
+		if index is not None:
+			return False  # Key already exists, return False
+
+		# Insert the key-value pair into the first free slot of its probe sequence. The key and value go
+		# first, so a value IntHashTable can't store leaves the slot free
+		self.keys[free] = key
+		self.values[free] = value
+		self.hashes[free] = hash_value
+		if self.states[free] == REMOVED:
+			self.tombstones -= 1  # Reusing a removed record's slot
+		self.states[free] = FULL
+		self.count += 1
+
+		# Check the load factor and rehash if necessary, as HashTable does
+		if (self.count + self.tombstones) / self.cap > 0.7:
+			if self.count / self.cap > 0.5:
+				self.rehash(self.cap * 2)  # Rehash the table into double the capacity
+			else:
+				self.rehash(self.cap)  # Mostly removed records: rehash at the same capacity to clear them out
+		return True  # Return True after successful insertion
+
+	def rehash(self, new_cap):
+		# Move every record into new slot arrays of new_cap slots, placing them by their cached hash
+		states = self.states
+		hashes = self.hashes
+		keys = self.keys
+		values = self.values
+		self.cap = new_cap
+		self.allocate(new_cap)
+		self.tombstones = 0
+		new_states = self.states
+		new_hashes = self.hashes
+		new_keys = self.keys
+		new_values = self.values
+		for i in range(len(states)):
+			if states[i] == FULL:
+				hash_value = hashes[i]
+				index = hash_value % new_cap
+				while new_states[index] != EMPTY:  # The new arrays only have EMPTY and FULL slots
+					index += 1
+					if index == new_cap:
+						index = 0
+				new_states[index] = FULL
+				new_hashes[index] = hash_value
+				new_keys[index] = keys[i]
+				new_values[index] = values[i]
+
+	def modify(self, key, value):
+		index, _ = self.probe(key, hash(key))
+		if index is not None:
+			self.values[index] = value  # Modify the value associated with the key
+			return True  # Return True after successful modification
+		return False  # Key not found, return False
+
+	def remove(self, key):
+		index, _ = self.probe(key, hash(key))
+		if index is not None:
+			self.states[index] = REMOVED  # Remove the record, leaving a tombstone so later probes continue past it
+			self.clear_slot(index)
+			self.count -= 1
+			self.tombstones += 1
+			return True  # Return True after successful removal
+		return False  # Key not found, return False
+
+	def search(self, key):
+		index, _ = self.probe(key, hash(key))
+		if index is not None:
+			return self.values[index]  # Return the value associated with the key
+		return None  # Key not found, return None
+
+	@classmethod
+	def from_items(cls, items, initial_capacity=32):
+		# Build a table from (key, value) pairs, with the slot arrays allocated once, like HashTable.from_items
+		items = items if hasattr(items, '__len__') else list(items)
+		table = cls(HashTable.capacity_for(len(items), initial_capacity))
+		table.update(items)
+		return table
+
+	def reserve(self, records):
+		# Resize the table once, if needed, so that it can hold records records without resizing
+		new_cap = HashTable.capacity_for(records, self.cap)
+		if new_cap != self.cap or (records + self.tombstones) / self.cap > 0.7:
+			self.rehash(new_cap)
+
+	def update(self, items):
+		# Insert (key, value) pairs in one pass, replacing the value of keys already in the table.
+		# The table is sized for all of them first. Returns the number of new records
+		items = items if hasattr(items, '__len__') else list(items)
+		self.reserve(self.count + len(items))
+		added = 0
+		for key, value in items:
+			if self.insert(key, value):
+				added += 1
+			else:
+				self.modify(key, value)  # Key already exists: replace its value
+		return added
+
+	def get_many(self, keys, default=None):
+		# Look up a batch of keys. Returns their values in the same order, default for missing keys
+		probe = self.probe
+		values = self.values
+		found = []
+		for key in keys:
+			index, _ = probe(key, hash(key))
+			found.append(default if index is None else values[index])
+		return found
+
+	def items(self):
+		# Yield every (key, value) record
+		for i in range(self.cap):
+			if self.states[i] == FULL:
+				yield self.keys[i], self.values[i]
+
+	def save(self, path, tag=0):
+		# Write the records to a file MappedHashTable can open. Keys must be unsigned and values signed
+		# 64-bit integers
+		MappedHashTable.write(path, self.items(), len(self), tag)
+
+	def probe_stats(self):
+		# Returns the longest and the mean number of slots a successful search looks at, over every record
+		cap = self.cap
+		hashes = self.hashes
+		lengths = [(i - hashes[i] % cap) % cap + 1 for i in range(cap) if self.states[i] == FULL]
+		return (max(lengths), sum(lengths) / len(lengths)) if lengths else (0, 0.0)
+
+	def capacity(self):
+		return self.cap  # Return the total capacity of the table
+
+	def __len__(self):
+		return self.count  # Return the number of records in the table
+
+class IntHashTable(CompactHashTable):
+	# CompactHashTable for unsigned 64-bit integer keys (such as Zobrist hashes) and signed 64-bit integer
+	# values, kept in typed arrays: 25 bytes per slot and no Python object per record. Storing a key or
+	# value outside those ranges raises OverflowError
+	def allocate(self, cap):
+		# Create the slot arrays for a capacity, every slot EMPTY
+		self.states = bytearray(cap)  # EMPTY, FULL or REMOVED
+		self.hashes = array('q', bytes(8 * cap))  # hash(key) of each record
+		self.keys = array('Q', bytes(8 * cap))
+		self.values = array('q', bytes(8 * cap))
+
+	def clear_slot(self, index):
+		pass  # Typed arrays hold no references
+
+class RobinHoodHashTable(CompactHashTable):
+	# CompactHashTable using Robin Hood hashing. An insert that meets a record closer to its home slot
+	# (the slot its hash points to) than the record being placed swaps the two and carries on placing the
+	# other one, so probe lengths even out instead of long clusters building up behind a few records.
+	# Records along a probe sequence are therefore ordered by distance from home, which lets a lookup for
+	# a missing key stop as soon as it meets a record closer to home than the key would be. Removal shifts
+	# the records after the removed one back a slot, so there are no tombstones
+	def probe(self, key, hash_value):
+		# Follow the key's probe sequence until the key is found or the key can't be further on.
+		# Returns the index of the key's slot (None if not found) and None, like CompactHashTable.probe
+		states = self.states
+		hashes = self.hashes
+		keys = self.keys
+		cap = self.cap
+		index = hash_value % cap
+		for dist in range(cap):
+			if states[index] == EMPTY:
+				return None, None  # Key not found
+			if (index - hashes[index] % cap) % cap < dist:
+				return None, None  # This record is closer to home than the key would be, so the key isn't stored
+			if hashes[index] == hash_value and keys[index] == key:
+				return index, None  # Found the key
+			index += 1
+			if index == cap:
+				index = 0
+		return None, None  # Probed every slot without finding the key
+
+	def place(self, hash_value, key, value):
+		# Robin Hood insertion of a record known not to be in the table
+		states = self.states
+		hashes = self.hashes
+		keys = self.keys
+		values = self.values
+		cap = self.cap
+		index = hash_value % cap
+		dist = 0
+		while states[index] == FULL:
+			other = (index - hashes[index] % cap) % cap
+			if other < dist:
+				# Take the slot from the record closer to home, and go on placing that one
+				hash_value, hashes[index] = hashes[index], hash_value
+				key, keys[index] = keys[index], key
+				value, values[index] = values[index], value
+				dist = other
+			index += 1
+			if index == cap:
+				index = 0
+			dist += 1
+		states[index] = FULL
+		hashes[index] = hash_value
+		keys[index] = key
+		values[index] = value
+
+	def insert(self, key, value):
+		hash_value = hash(key)  # Compute the hash value of the key once
+		index, _ = self.probe(key, hash_value)
+		if index is not None:
+			return False  # Key already exists, return False
+		self.place(hash_value, key, value)
+		self.count += 1
+		if self.count / self.cap > 0.7:
+			self.rehash(self.cap * 2)  # Rehash the table into double the capacity, as HashTable does
+		return True  # Return True after successful insertion
+
+	def rehash(self, new_cap):
+		# Move every record into new slot arrays of new_cap slots, placing them by their cached hash
+		states = self.states
+		hashes = self.hashes
+		keys = self.keys
+		values = self.values
+		self.cap = new_cap
+		self.allocate(new_cap)
+		for i in range(len(states)):
+			if states[i] == FULL:
+				self.place(hashes[i], keys[i], values[i])
+
+	def remove(self, key):
+		index, _ = self.probe(key, hash(key))
+		if index is None:
+			return False  # Key not found, return False
+		states = self.states
+		hashes = self.hashes
+		keys = self.keys
+		values = self.values
+		cap = self.cap
+		# Shift the following records back one slot until an empty slot or a record already at home
+		following = index + 1 if index + 1 < cap else 0
+		while states[following] == FULL and (following - hashes[following] % cap) % cap > 0:
+			hashes[index] = hashes[following]
+			keys[index] = keys[following]
+			values[index] = values[following]
+			index = following
+			following = index + 1 if index + 1 < cap else 0
+		states[index] = EMPTY
+		self.clear_slot(index)
+		self.count -= 1
+		return True  # Return True after successful removal
+
+class MappedHashTable:
+	# Read-only hash table of unsigned 64-bit integer keys and signed 64-bit integer values, in a file
+	# written by MappedHashTable.write (or a table's save method) and opened through mmap. Opening only
+	# reads the header: the operating system pages the slots in as lookups touch them, and every
+	# process that opens the same file shares those pages.
+	#
+	# File layout, little-endian: a header of MAGIC, the capacity, the number of records and a tag
+	# (any 64-bit number the writer wants to check on open, e.g. a hashing seed); then the keys of
+	# every slot, the values of every slot, and one state byte per slot (EMPTY or FULL). A key's probe
+	# sequence starts at key % capacity, so the file doesn't depend on Python's hash().
+	# The number in MAGIC goes up whenever the file layout or what the values hold changes, so older
+	# files are refused rather than misread. 02: transposition table values pack a best move too.
+	# 03: that move has 16 bits, for boards of more than 255 cells
+	MAGIC = b'A2HTBL03'
+	HEADER = struct.Struct('<8sQQQ')
+
+	@classmethod
+	def write(cls, path, items, records, tag=0):
+		# Write records (key, value) pairs with distinct keys to path, sized like a table holding them.
+		# The file is written under a temporary name and then renamed, so readers never see half of it
+		cap = HashTable.capacity_for(records)
+		keys = array('Q', bytes(8 * cap))
+		values = array('q', bytes(8 * cap))
+		states = bytearray(cap)
+		count = 0
+		for key, value in items:
+			index = key % cap
+			while states[index] == FULL:
+				if keys[index] == key:
+					raise ValueError("duplicate key {}".format(key))
+				index = (index + 1) % cap
+			keys[index] = key
+			values[index] = value
+			states[index] = FULL
+			count += 1
+		if count != records:
+			raise ValueError("expected {} records, got {}".format(records, count))
+		if struct.pack('=H', 1) != struct.pack('<H', 1):
+			keys.byteswap()  # The file is little-endian
+			values.byteswap()
+		temporary = '{}.{}.tmp'.format(path, os.getpid())
+		with open(temporary, 'wb') as file:
+			file.write(cls.HEADER.pack(cls.MAGIC, cap, count, tag))
+			file.write(keys.tobytes())
+			file.write(values.tobytes())
+			file.write(states)
+		os.replace(temporary, path)
+
+	def __init__(self, path):
+		# Open a file written by write. Only the header is read here
+		self.map = None
+		if struct.pack('=H', 1) != struct.pack('<H', 1):
+			raise ValueError("MappedHashTable needs a little-endian machine")
+		with open(path, 'rb') as file:
+			self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+		try:
+			if len(self.map) < self.HEADER.size:
+				raise ValueError("{} is not a hash table file".format(path))
+			magic, self.cap, self.count, self.tag = self.HEADER.unpack_from(self.map)
+			if magic != self.MAGIC or len(self.map) != self.HEADER.size + 17 * self.cap:
+				raise ValueError("{} is not a hash table file".format(path))
+			view = memoryview(self.map)
+			start = self.HEADER.size
+			# Views straight into the mapped file, one for each array; nothing is copied
+			self.keys = view[start:start + 8 * self.cap].cast('Q')
+			self.values = view[start + 8 * self.cap:start + 16 * self.cap].cast('q')
+			self.states = view[start + 16 * self.cap:]
+		except BaseException:
+			self.close()
+			raise
+
+	def search(self, key):
+		# Return the value of the key, or None if it isn't in the table
+		cap = self.cap
+		states = self.states
+		keys = self.keys
+		index = key % cap
+		for _ in range(cap):
+			if states[index] == EMPTY:
+				return None  # Key not found
+			if keys[index] == key:
+				return self.values[index]  # Found the key
+			index += 1
+			if index == cap:
+				index = 0
+		return None  # Probed every slot without finding the key
+
+	def get_many(self, keys, default=None):
+		# Look up a batch of keys. Returns their values in the same order, default for missing keys
+		found = []
+		for key in keys:
+			value = self.search(key)
+			found.append(default if value is None else value)
+		return found
+
+	def items(self):
+		# Yield every (key, value) record
+		for i in range(self.cap):
+			if self.states[i] == FULL:
+				yield self.keys[i], self.values[i]
+
+	def capacity(self):
+		return self.cap  # Return the total capacity of the table
+
+	def __len__(self):
+		return self.count  # Return the number of records in the table
+
+	def close(self):
+		# Release the views and unmap the file
+		for name in ('keys', 'values', 'states'):
+			view = getattr(self, name, None)
+			if view is not None:
+				view.release()
+				setattr(self, name, None)
+		if self.map is not None:
+			self.map.close()
+			self.map = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		self.close()
+
+class ShardedHashTable:
+	# Thread-safe table made of independent HashTable shards, each with its own lock, so threads working
+	# on different shards never wait for each other and a resize only holds up its own shard.
+	#
+	# Writers lock their shard and bump its version number before and after changing it, so the version
+	# is odd while a change is in progress. Searches don't take the lock: they read the version, search,
+	# and keep the result if the version is even and unchanged, which means no write overlapped them.
+	# Otherwise (or if the shard changed under them so badly that the search raised) they search again
+	# holding the lock. Readers therefore never block each other
+	def __init__(self, shards=16, initial_capacity=32):  # Initialize the table with 16 shards by default
+		if shards < 1:
+			raise ValueError("shards must be at least 1")
+		self.shards = [HashTable(initial_capacity) for _ in range(shards)]
+		self.locks = [threading.Lock() for _ in range(shards)]
+		self.versions = [0] * shards  # Odd while the shard is being changed
+
+	def shard_of(self, key):
+		# Index of the shard a key belongs to. The hash is mixed first: each shard places keys by hash % cap,
+		# so picking shards by hash % shards would leave most slots of every shard unused
+		return ((hash(key) * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) * len(self.shards) >> 64
+
+	def write(self, index, operation, *args):
+		# Run operation (an unbound HashTable method) on shard index under its lock, marking the change
+		with self.locks[index]:
+			self.versions[index] += 1
+			try:
+				return operation(self.shards[index], *args)
+			finally:
+				self.versions[index] += 1
+
+	def insert(self, key, value):
+		return self.write(self.shard_of(key), HashTable.insert, key, value)
+
+	def modify(self, key, value):
+		return self.write(self.shard_of(key), HashTable.modify, key, value)
+
+	def remove(self, key):
+		return self.write(self.shard_of(key), HashTable.remove, key)
+
+	def search(self, key):
+		index = self.shard_of(key)
+		version = self.versions[index]
+		if version % 2 == 0:
+			try:
+				value = self.shards[index].search(key)
+			except (IndexError, TypeError):
+				value = None  # A resize or removal happened mid-search; the version check below catches it
+			if self.versions[index] == version:
+				return value  # No write overlapped the search, so the result is consistent
+		with self.locks[index]:
+			return self.shards[index].search(key)
+
+	def get_many(self, keys, default=None):
+		# Look up a batch of keys. Returns their values in the same order, default for missing keys
+		found = []
+		for key in keys:
+			value = self.search(key)
+			found.append(default if value is None else value)
+		return found
+
+	def update(self, items):
+		# Insert (key, value) pairs, replacing the value of existing keys, locking each shard once.
+		# Returns the number of new records
+		groups = [[] for _ in self.shards]
+		for key, value in items:
+			groups[self.shard_of(key)].append((key, value))
+		return sum(self.write(index, HashTable.update, group) for index, group in enumerate(groups) if group)
+
+	def items(self):
+		# Yield every (key, value) record, copying one shard at a time under its lock
+		for index in range(len(self.shards)):
+			with self.locks[index]:
+				records = list(self.shards[index].items())
+			yield from records
+
+	def capacity(self):
+		return sum(shard.capacity() for shard in self.shards)  # Total capacity of every shard
+
+	def __len__(self):
+		return sum(len(shard) for shard in self.shards)  # Number of records in every shard
@@ -1,6 +1,18 @@
 # Main Authors: Talween, Sagar, Gaganjot
 # Main Reviewer:  Talween, Sagar, Gaganjot
 
+import time
+from concurrent.futures import wait
+from compact_board import CompactBoard
+from transposition import EXACT, LOWER, UPPER
+
+# Search algorithms GameTree.get_move can use to score the root moves
+SEARCH_MODES = ('minimax', 'alphabeta')
+
+class SearchTimeout(Exception):
+    # Raised inside the search when the deadline of an iterative deepening iteration has passed
+    pass
+
 def copy_board(board):
     # Create a deep copy of the current board state to avoid mutating the original board
     current_board = []   
@@ -28,83 +40,531 @@ def evaluate_board(board, player):
 
 class GameTree:
     class Node:
-        def __init__(self, board, depth, player, tree_height=4):
-            # Initialize the node with a copy of the board, depth, and the current player
-            self.board = copy_board(board)
+        def __init__(self, state, depth, player, tree_height=4):
+            # Initialize the node with the tree's shared board, depth, and the current player.
+            # Nodes don't own a board: children play their move (and its overflow) on the shared CompactBoard while they
+            # are being searched and take it back afterwards, so no board is ever copied during search.
+            # Children are not built here either: generate_children produces them lazily when the
+            # search reaches this node, so only the nodes on the current search path are alive
+            self.state = state
             self.depth = depth  # Current depth of the node in the game tree
             self.player = player  # Player to move at this node
-            self.children = []  # List to hold child nodes (possible moves from this position)
-            
-            # If the current depth is less than the maximum tree height, generate children nodes
-            if depth < tree_height:
-                self.generate_children(tree_height)
-
-        def generate_children(self, tree_height):
-            # Generate all possible board states (children) from the current node
-            height = len(self.board)  # Get the number of rows in the board
-            width = len(self.board[0])  # Get the number of columns in the board
-            for row in range(height):
-                for col in range(width):
-                    # Check if the current cell is empty (i.e., a valid move)
-                    if self.board[row][col] == 0:
-                        new_board = copy_board(self.board)  # Copy the current board state
-                        new_board[row][col] = self.player  # Place the player's piece in the empty cell
-                        # Create a new child node with the updated board, increased depth, and the opponent's turn
-                        self.children.append(GameTree.Node(new_board, self.depth + 1, -self.player, tree_height))
-
-    def __init__(self, board, player, tree_height=4):
+            self.tree_height = tree_height  # Maximum depth children can be generated to
+            self.hasher = None  # ZobristHasher of the tree's transposition table, if it has one
+            self.key = None  # Zobrist hash of this position (board and player to move), if hashed
+            self.overflow_cache = None  # OverflowCache the overflow of each move is looked up in, if any
+            self.move = None  # (row, col) of the move that led from the parent to this node
+            self.index = None  # Row-major index of the same move
+
+        @property
+        def board(self):
+            # The position as a list-of-lists grid. Only valid while the search is at this node
+            return self.state.to_grid()
+
+        def moves(self):
+            # Lazily yield the row-major index of every move the game allows from this position
+            if self.depth >= self.tree_height:
+                return  # Nodes at the maximum tree height have no children
+            state = self.state
+            if self.depth > 0 and state.all_same_sign():
+                return  # The last move took every piece of the player to move, so the game is over
+            cells = state.cells
+            player = self.player
+            for index in range(len(cells)):
+                # Like Board.valid_move, a piece can go on an empty cell or on one of the player's own cells
+                if cells[index] * player >= 0:
+                    yield index
+
+        def generate_children(self, moves=None):
+            # Lazily generate the child nodes (possible board states) one at a time.
+            # A caller that stops early can pass its own moves() iterator and count what is left in it
+            if moves is None:
+                moves = self.moves()
+            state = self.state
+            for index in moves:
+                # Add the player's piece on the shared board and resolve the overflow it sets off,
+                # exactly as game.py does, then create the child with increased depth and the opponent's turn
+                marker = state.make_move(index, self.player)
+                state.overflow(self.overflow_cache)
+                child = GameTree.Node(state, self.depth + 1, -self.player, self.tree_height)
+                child.move = divmod(index, state.cols)
+                child.index = index
+                child.overflow_cache = self.overflow_cache
+                if self.hasher is not None:
+                    # Update the hash for the cells that changed and the other player being to move
+                    child.hasher = self.hasher
+                    key = self.key ^ self.hasher.side_key
+                    for i, old_value, new_value in state.changes_since(marker):
+                        key = self.hasher.update(key, i, old_value, new_value)
+                    child.key = key
+                try:
+                    yield child
+                finally:
+                    # Take the move back once the caller is done with the child, or stops iterating
+                    state.unmake_move(marker)
+
+    def __init__(self, board, player, tree_height=4, search='minimax', transposition_table=None,
+                 time_limit=None, max_depth=None, executor=None, overflow_cache=None, ordering=False):
         # Initialize the game tree with the root node, representing the current state of the game
+        if search not in SEARCH_MODES:
+            raise ValueError("unknown search mode: {}".format(search))
         self.player = player  # The player whose move is being simulated by the tree
-        self.root = self.Node(board, 0, player, tree_height)  # The root node represents the current board state
+        self.search = search  # Search algorithm used by get_move ('minimax' or 'alphabeta')
+        self.nodes_visited = 0  # Number of nodes evaluated by the last call to get_move
+        self.nodes_pruned = 0  # Number of child subtrees skipped by alpha-beta cutoffs in the last get_move
+        self.cutoffs = 0  # Number of alpha-beta cutoffs in the last get_move
+        self.first_move_cutoffs = 0  # Cutoffs caused by the first move searched, the more the better the ordering
+        # Plies searched below the root before positions are scored. Minimax used to stop at depth 3,
+        # which is what the default tree_height of 4 gives
+        self.depth_limit = tree_height - 1
+        # With a time limit (in seconds), get_move deepens the search one ply at a time, up to
+        # max_depth plies if given, and returns the move of the deepest search that finished in time
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.completed_depth = 0  # Deepest search finished by the last get_move
+        self.deadline = None  # perf_counter() value the running search has to finish by, if any
+        self.horizon_reached = False  # Whether the running search scored any node at the depth limit
+        # Optional concurrent.futures executor (normally a ProcessPoolExecutor) the root moves are
+        # scored in. The transposition table is not shared with its workers
+        self.executor = executor
+        self.tree_height = tree_height  # Height of the tree searched by a fixed depth get_move
+        # Optional TranspositionTable shared by every position of the search (and possibly later searches)
+        self.transposition_table = transposition_table
+        # Optional OverflowCache of resolved overflows shared by every move of the search (and possibly
+        # later searches). It is not shared with executor workers
+        self.overflow_cache = overflow_cache
+        # With ordering, alpha-beta searches the moves most likely to cause a cutoff first (see
+        # ordered_moves). It only changes how many nodes are searched, never the chosen move
+        self.ordering = ordering
+        self.killers = {}  # Depth -> the last two quiet moves that caused a cutoff at that depth
+        # Player -> for each cell, the sum of the squared remaining depths of the cutoffs its move caused
+        self.history = {1: [0] * len(board) * len(board[0]), -1: [0] * len(board) * len(board[0])}
+        self.cancelled = False  # Set by cancel(), possibly from another thread, to stop the running search
+        self.interruptible = True  # False during a search that must finish, which cancel() then doesn't stop
+        self.reused_depth = 0  # Plies the root position had already been searched to when advance() moved to it
+        self.set_root(board)
+
+    def set_root(self, board):
+        # Make the board the position the tree searches from, with the tree's player to move
+        self.state = CompactBoard.from_grid(board)  # The position being searched, changed in place by the search
+        self.root = self.Node(self.state, 0, self.player, self.tree_height)  # The root node represents the current board state
+        self.root.overflow_cache = self.overflow_cache
+        if self.transposition_table is not None:
+            self.root.hasher = self.transposition_table.hasher
+            self.root.key = self.transposition_table.hasher.hash_board(board, self.player)
+        self.depth_limit = self.tree_height - 1
+        self.root_best = None  # Row-major index of the best root move of the last finished search
+
+    def advance(self, board, age_history=True):
+        # Move the root to a later position of the same game, normally the one after the tree's move and
+        # the opponent's reply, keeping what earlier searches learned for the next get_move: the
+        # transposition table already holds the subtree below the new root if get_move or ponder reached
+        # it, and the history table is kept, halved so newer cutoffs count for more. Killer moves belong to
+        # a depth, so they start over. A bot that also advances to the position after its own move, to
+        # ponder there, passes age_history=False for that step so the history is halved once per turn.
+        # Returns the plies the new root had already been searched to
+        if (len(board), len(board[0])) != (self.state.rows, self.state.cols):
+            raise ValueError("the board is not the size of the tree's board")
+        self.set_root(board)
+        self.killers = {}
+        if age_history:
+            for values in self.history.values():
+                for index in range(len(values)):
+                    values[index] //= 2
+        self.cancelled = False
+        self.reused_depth = 0
+        if self.transposition_table is not None:
+            entry = self.transposition_table.probe(self.root.key)
+            if entry is not None:
+                self.reused_depth = entry[0]
+        return self.reused_depth
+
+    def cancel(self):
+        # Stop the running get_move or ponder as soon as it reaches its next node. Safe to call from
+        # another thread; the search takes back its moves before returning. get_move still returns a move:
+        # the one-ply search it falls back on runs to completion
+        self.cancelled = True
+
+    def probe(self, node, alpha, beta):
+        # Look the node up in the transposition table. Returns (score, move): a score the search can use
+        # as is, or None if the node has to be searched, and the best move stored for it, if any
+        if self.transposition_table is None:
+            return None, None
+        entry = self.transposition_table.probe(node.key)
+        if entry is None:
+            return None, None
+        depth, score, bound, move = entry
+        if depth < self.depth_limit - node.depth:
+            return None, move  # Only searched to a shallower depth than needed here, but its move is a good guess
+        if bound == EXACT or (bound == LOWER and score >= beta) or (bound == UPPER and score <= alpha):
+            # The stored search may have reached the depth limit below this node. Assume it did, or a
+            # deepening search whose nodes are all in the table would stop as if the game tree ended
+            self.horizon_reached = True
+            return score, move
+        return None, move
+
+    def store(self, node, score, alpha, beta, move=None):
+        # Record the score of a searched node, with the bound type implied by the window it was searched with
+        if self.transposition_table is None:
+            return
+        if score <= alpha:
+            bound = UPPER
+        elif score >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self.transposition_table.store(node.key, self.depth_limit - node.depth, score, bound, move)
+
+    def ordered_moves(self, node, tt_move=None):
+        # The node's moves, the ones most likely to cause a cutoff first: the transposition table's best
+        # move, then moves that overflow their cell (those capturing the most opponent neighbours first),
+        # then the killer moves of this depth, then the quiet moves by their history score. Ties keep
+        # row-major order. Returns an iterator, like node.moves(), so a cutoff can count what is left
+        state = node.state
+        cells = state.cells
+        capacity = state.capacity
+        neighbors = state.neighbors
+        player = node.player
+        killers = self.killers.get(node.depth, ())
+        history = self.history[player]
+        ranked = []
+        for index in node.moves():
+            if index == tt_move:
+                rank = (3, 0)
+            elif abs(cells[index]) == capacity[index]:
+                # The added piece overflows the cell, taking over every neighbour the opponent owns
+                rank = (2, sum(1 for neighbor in neighbors[index] if cells[neighbor] * player < 0))
+            elif index in killers:
+                rank = (1, 0)
+            else:
+                rank = (0, history[index])
+            ranked.append((rank, index))
+        ranked.sort(key=lambda item: item[0], reverse=True)  # Stable, so ties stay in row-major order
+        return iter([index for rank, index in ranked])
+
+    def record_cutoff(self, node, index, first):
+        # Count a cutoff caused by the move at index, and remember the move for ordering later searches.
+        # Only quiet moves are remembered: moves that overflow are tried early anyway
+        self.cutoffs += 1
+        if first:
+            self.first_move_cutoffs += 1
+        if not self.ordering:
+            return
+        state = node.state
+        if abs(state.cells[index]) == state.capacity[index]:
+            return
+        killers = self.killers.setdefault(node.depth, [])
+        if index not in killers:
+            killers.insert(0, index)
+            del killers[2:]
+        self.history[node.player][index] += (self.depth_limit - node.depth) ** 2
+
+    def evaluate(self, node):
+        # Same score as evaluate_board, computed in O(1) from the value counts the shared board
+        # keeps up to date as moves are made and taken back, instead of scanning every cell
+        count = node.state.count
+        return 100 * self.player * count(4 * self.player) + count(self.player) - count(-self.player)
 
     def minimax(self, node, maximizing_player):
         # Minimax algorithm to evaluate the best move from the current node
-        # Base case: if there are no children (no further moves possible) or the maximum depth is reached
-        if len(node.children) == 0 or node.depth == 3:
-            return evaluate_board(node.board, self.player)  # Evaluate and return the score of the board
+        self.nodes_visited += 1
+        self.check_deadline()
+        # A position reached through another move order may already have been scored
+        score, _ = self.probe(node, float('-inf'), float('inf'))
+        if score is None:
+            score = self.minimax_search(node, maximizing_player)
+            self.store(node, score, float('-inf'), float('inf'))
+        return score
+
+    def minimax_search(self, node, maximizing_player):
+        # Base case: the maximum depth is reached
+        if node.depth == self.depth_limit:
+            self.horizon_reached = True
+            return self.evaluate(node)  # Evaluate and return the score of the board
 
         if maximizing_player:
             # If the current player is maximizing (trying to get the highest score)
             max_eval = float('-inf')  # Start with the lowest possible value
-            for child in node.children:
+            for child in node.generate_children():
                 # Recursively evaluate each child node with the minimizing player
                 eval = self.minimax(child, False)
                 max_eval = max(max_eval, eval)  # Choose the maximum value from the evaluations
+            if max_eval == float('-inf'):
+                # No children were generated (no further moves possible), so score the board itself
+                return self.evaluate(node)
             return max_eval
         else:
             # If the current player is minimizing (trying to get the lowest score)
             min_eval = float('inf')  # Start with the highest possible value
-            for child in node.children:
+            for child in node.generate_children():
                 # Recursively evaluate each child node with the maximizing player
                 eval = self.minimax(child, True)
                 min_eval = min(min_eval, eval)  # Choose the minimum value from the evaluations
+            if min_eval == float('inf'):
+                # No children were generated (no further moves possible), so score the board itself
+                return self.evaluate(node)
             return min_eval
 
+    def alphabeta(self, node, alpha, beta, maximizing_player):
+        # Minimax with alpha-beta pruning. The returned value is exact whenever it lies strictly
+        # between alpha and beta; otherwise it is only a bound, which is all the caller needs
+        self.nodes_visited += 1
+        self.check_deadline()
+        # A position reached through another move order may already have a usable score or bound
+        score, move = self.probe(node, alpha, beta)
+        if score is None:
+            score, move = self.alphabeta_search(node, alpha, beta, maximizing_player, move)
+            self.store(node, score, alpha, beta, move)
+        return score
+
+    def alphabeta_search(self, node, alpha, beta, maximizing_player, tt_move=None):
+        # Returns the score and the row-major index of the best move (None at a leaf).
+        # Same leaf tests as minimax so both searches score exactly the same positions
+        if node.depth == self.depth_limit:
+            self.horizon_reached = True
+            return self.evaluate(node), None
+
+        # Shared with generate_children so the skipped moves can be counted
+        moves = self.ordered_moves(node, tt_move) if self.ordering else node.moves()
+        children = node.generate_children(moves)
+        best_index = None
+        searched = 0
+        node_alpha, node_beta = alpha, beta  # The window the node was searched with
+        if maximizing_player:
+            max_eval = float('-inf')
+            for child in children:
+                eval = self.alphabeta(child, alpha, beta, False)
+                searched += 1
+                if eval > max_eval:
+                    max_eval = eval
+                    best_index = child.index
+                alpha = max(alpha, eval)
+                if alpha >= beta:
+                    # The minimizing parent already has a better option, so the remaining siblings can't matter
+                    children.close()  # Take back the child's move
+                    self.nodes_pruned += sum(1 for _ in moves)
+                    self.record_cutoff(node, child.index, searched == 1)
+                    break
+            if max_eval == float('-inf'):
+                return self.evaluate(node), None
+            if max_eval <= node_alpha:
+                best_index = None  # Every move failed low, so none is known to be better than the others
+            return max_eval, best_index
+        else:
+            min_eval = float('inf')
+            for child in children:
+                eval = self.alphabeta(child, alpha, beta, True)
+                searched += 1
+                if eval < min_eval:
+                    min_eval = eval
+                    best_index = child.index
+                beta = min(beta, eval)
+                if alpha >= beta:
+                    # The maximizing parent already has a better option, so the remaining siblings can't matter
+                    children.close()  # Take back the child's move
+                    self.nodes_pruned += sum(1 for _ in moves)
+                    self.record_cutoff(node, child.index, searched == 1)
+                    break
+            if min_eval == float('inf'):
+                return self.evaluate(node), None
+            if min_eval >= node_beta:
+                best_index = None  # Every move failed high, so none is known to be better than the others
+            return min_eval, best_index
+
+    def check_deadline(self):
+        # Abandon the running search once its deadline has passed or it is cancelled, unless it must finish
+        if not self.interruptible:
+            return
+        if self.cancelled or (self.deadline is not None and time.perf_counter() > self.deadline):
+            raise SearchTimeout()
+
     def get_move(self):
-        # Determine the best move by evaluating all possible moves from the root node
+        # Determine the best move, either with a fixed depth search or by iterative deepening
+        self.nodes_visited = 0
+        self.nodes_pruned = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.killers = {}
+        if self.time_limit is not None:
+            return self.iterative_deepening(self.time_limit, self.max_depth)
+        try:
+            best_move, best_score = self.search_root()
+        except SearchTimeout:
+            # Cancelled: take back the moves of the abandoned search and fall back on the best move one ply deep.
+            # That search runs here, not in the executor, whose workers may still be busy with the abandoned one
+            self.state.unmake_move(0)
+            executor, self.executor = self.executor, None
+            try:
+                return self.iterative_deepening(0, 1)
+            finally:
+                self.executor = executor
+        self.completed_depth = self.depth_limit
+        return best_move
+
+    def iterative_deepening(self, time_limit, max_depth=None):
+        # Search 1, 2, 3... plies deep and return the best move of the deepest search that finished
+        # before the deadline. Each search costs a fraction of the next one, so little time is wasted
+        deadline = time.perf_counter() + time_limit
+        best_move = None
+        depth = 1
+        while max_depth is None or depth <= max_depth:
+            self.depth_limit = depth
+            self.root.tree_height = depth + 1  # Let the lazily generated children go one ply deeper
+            # The depth 1 search always runs to completion, even if cancelled, so there is a move to fall back on
+            self.deadline = None if depth == 1 else deadline
+            self.interruptible = depth > 1
+            self.horizon_reached = False
+            try:
+                best_move, best_score = self.search_root()
+            except SearchTimeout:
+                # Take back the moves of the abandoned search and keep the move from the last search that finished
+                self.state.unmake_move(0)
+                break
+            finally:
+                self.deadline = None
+                self.interruptible = True
+            self.completed_depth = depth
+            if not self.horizon_reached or time.perf_counter() >= deadline:
+                break  # The whole game tree fits in this depth, or there is no time left to go deeper
+            depth += 1
+        return best_move
+
+    def ponder(self, max_depth=None):
+        # Search the root position with the opponent to move, one ply deeper at a time, until cancel() is
+        # called, max_depth plies are done or the whole game tree fits. No move comes out of it: the point
+        # is to fill the transposition table while the opponent thinks, so that after advance() to the
+        # position they reach, get_move finds its subtree already searched. Scores stay from the tree
+        # player's point of view, like those of get_move, so the two can share the table.
+        # Meant to run on a background thread. Returns the depth of the deepest search that finished
+        self.completed_depth = 0
+        depth = 2  # The opponent's reply and the tree player's answer to it
+        while not self.cancelled and (max_depth is None or depth <= max_depth):
+            self.depth_limit = depth
+            # Like score_position, the position is searched as a child of the tree player's last move
+            node = self.Node(self.state, 1, -self.player, depth + 1)
+            node.overflow_cache = self.overflow_cache
+            if self.transposition_table is not None:
+                node.hasher = self.root.hasher
+                node.key = self.root.key ^ self.root.hasher.side_key
+            self.horizon_reached = False
+            try:
+                if self.search == 'alphabeta':
+                    self.alphabeta(node, float('-inf'), float('inf'), False)
+                else:
+                    self.minimax(node, False)
+            except SearchTimeout:
+                self.state.unmake_move(0)  # Take back the moves of the abandoned search
+                break
+            self.completed_depth = depth
+            if not self.horizon_reached:
+                break
+            depth += 1
+        self.depth_limit = self.tree_height - 1
+        return self.completed_depth
+
+    def search_root(self):
+        # Evaluate every possible move from the root node and return the best move and its score
+        if self.executor is not None:
+            return self.search_root_parallel()
         best_move = None  # Initialize the best move as None
+        best_index = None  # Row-major index of the best move
         best_score = float('-inf')  # Start with the lowest possible value for the best score
 
-        for child in self.root.children:
-            # Evaluate each child node (possible move) using the minimax algorithm
-            score = self.minimax(child, False)  # Evaluate the move assuming the opponent will minimize the score
-            if score > best_score:
+        moves = None
+        if self.ordering and self.search == 'alphabeta':
+            # Start with the best move of the previous, shallower search when deepening
+            moves = self.ordered_moves(self.root, self.root_best)
+        for child in self.root.generate_children(moves):
+            # Evaluate each child node (possible move), assuming the opponent will minimize the score
+            if self.search == 'alphabeta':
+                # A move only matters if it beats the best score so far, so that score is the lower bound.
+                # Moves that can't beat it come back as a bound <= best_score and are never selected,
+                # which keeps the chosen move identical to plain minimax
+                if best_index is not None and child.index < best_index:
+                    # Ordered moves come out of row-major order. Plain minimax would have picked a move
+                    # earlier in that order on a tie, so one point less is enough here (scores are whole numbers)
+                    score = self.alphabeta(child, best_score - 1, float('inf'), False)
+                    better = score >= best_score
+                else:
+                    score = self.alphabeta(child, best_score, float('inf'), False)
+                    better = score > best_score
+            else:
+                score = self.minimax(child, False)
+                better = score > best_score
+            if better:
                 # If the score for this move is better than the current best score, update the best move
                 best_score = score
-                max_row_index = 0
-                max_col_index = 0
-                max_val = float('-inf')
-                for i in range(len(child.board)):
-                    for j in range(len(child.board[0])):
-                        # Identify the location of the move on the board by finding the highest value piece
-                        if child.board[i][j] * self.player > max_val:
-                            max_val = child.board[i][j] * self.player
-                            max_row_index = i  # Row index of the move
-                            max_col_index = j  # Column index of the move
-                best_move = (max_row_index, max_col_index)  # Store the best move coordinates
-
-        return best_move  # Return the coordinates of the best move
+                best_move = child.move  # Store the best move coordinates
+                best_index = child.index
+
+        self.root_best = best_index
+        return best_move, best_score  # Return the coordinates of the best move and its score
+
+    def search_root_parallel(self):
+        # Score the root moves in the executor's worker processes. Workers get each child board as
+        # bytes and search it with a full window, so every score is exact and picking the first best
+        # move in generation order gives the same move as the serial search
+        cols = self.state.cols
+        # perf_counter() can't be compared across processes, so workers get the deadline as a time.time() value.
+        # Each one checks it when it starts, so a move still queued when the time is up gives up at once
+        deadline = None if self.deadline is None else time.time() + (self.deadline - time.perf_counter())
+        moves = []
+        futures = []
+        for child in self.root.generate_children():
+            moves.append(child.move)
+            futures.append(self.executor.submit(score_position, child.state.to_bytes(), cols, self.player,
+                                                self.depth_limit, self.search, deadline, self.ordering))
+        # Wait in short steps so that cancel() and the deadline are noticed while the workers run. Moves not
+        # started yet are dropped then; running workers can't be interrupted and stop at their own deadline
+        pending = futures
+        while pending:
+            try:
+                self.check_deadline()
+            except SearchTimeout:
+                for future in pending:
+                    future.cancel()
+                raise
+            pending = wait(pending, timeout=0.05).not_done
+        results = [future.result() for future in futures]
+
+        best_move = None
+        best_score = float('-inf')
+        for move, result in zip(moves, results):
+            if result is None:
+                raise SearchTimeout()  # A worker ran out of time, so this depth is incomplete
+            score, nodes_visited, nodes_pruned, cutoffs, first_move_cutoffs, horizon_reached = result
+            self.nodes_visited += nodes_visited
+            self.nodes_pruned += nodes_pruned
+            self.cutoffs += cutoffs
+            self.first_move_cutoffs += first_move_cutoffs
+            self.horizon_reached = self.horizon_reached or horizon_reached
+            if score > best_score:
+                best_score = score
+                best_move = move
+        return best_move, best_score
 
     def clear_tree(self):
         # Clear the game tree to free up memory after a move has been decided
         self.root = None  # Set the root node to None, effectively clearing the tree
+
+def score_position(data, width, player, depth_limit, search, deadline=None, ordering=False):
+    # Worker process entry point: search the position reached by one of player's root moves, with the
+    # opponent to move, down to depth_limit plies below the root. deadline is a time.time() value, the
+    # same in every process. Returns (score, nodes visited, nodes pruned, cutoffs, first move cutoffs,
+    # horizon reached), or None if the deadline passed first
+    tree = GameTree(CompactBoard.from_bytes(data, width).to_grid(), player, tree_height=depth_limit + 1, search=search,
+                    ordering=ordering)
+    node = GameTree.Node(tree.state, 1, -player, depth_limit + 1)
+    if deadline is not None:
+        time_left = deadline - time.time()
+        if time_left <= 0:
+            return None  # The move waited in the queue until the search was out of time
+        tree.deadline = time.perf_counter() + time_left
+    try:
+        if search == 'alphabeta':
+            score = tree.alphabeta(node, float('-inf'), float('inf'), False)
+        else:
+            score = tree.minimax(node, False)
+    except SearchTimeout:
+        return None
+    return score, tree.nodes_visited, tree.nodes_pruned, tree.cutoffs, tree.first_move_cutoffs, tree.horizon_reached
@@ -0,0 +1,226 @@
+#
+#   Benchmark of the a2_parta HashTable: time per operation as the table grows.
+#   With probe sequences the cost of an operation depends on the load factor, not on
+#   the number of records, so the per-operation columns should stay roughly flat down the
+#   table. The max columns are the slowest single insert: with full rehashing it grows with
+#   the table, with incremental rehashing it should not.
+#   It then compares the memory per record and the rehash time of HashTable and the
+#   array-backed CompactHashTable and IntHashTable at the largest size, and the probe
+#   lengths of linear probing and RobinHoodHashTable just below the resize threshold,
+#   loading the tables one insert at a time against from_items, and saving a table to a
+#   file and opening it with MappedHashTable, and the throughput of threads sharing a
+#   ShardedHashTable against one HashTable behind a single lock.
+#   To use this, run: python bench_hashtable.py [largest size, default 1000000]
+
+import gc
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from a2_parta import HashTable, CompactHashTable, IntHashTable, RobinHoodHashTable, MappedHashTable, ShardedHashTable
+
+def time_per_op(operation, keys):
+    # Average nanoseconds of operation(key) over the keys
+    start = time.perf_counter()
+    for key in keys:
+        operation(key)
+    return (time.perf_counter() - start) / len(keys) * 1e9
+
+def insert_latencies(keys, incremental):
+    # Nanoseconds taken by each insert while the table grows from empty
+    table = HashTable(incremental=incremental)
+    latencies = []
+    clock = time.perf_counter_ns
+    # Python's cycle collector pauses for longer the more objects are alive, which would hide
+    # the table's own pauses, so it is off while inserting
+    gc.disable()
+    try:
+        for key in keys:
+            start = clock()
+            table.insert(key, 0)
+            latencies.append(clock() - start)
+    finally:
+        gc.enable()
+    return table, latencies
+
+def bench(size, samples=20000):
+    rng = random.Random(size)
+    keys = [rng.getrandbits(64) for _ in range(size)]  # Zobrist-like 64-bit keys
+    row = {}
+    for incremental in (False, True):
+        table, latencies = insert_latencies(keys, incremental)
+        latencies.sort()
+        mode = 'incr' if incremental else 'full'
+        row['insert ' + mode] = sum(latencies) / size
+        row['max ' + mode] = latencies[-1] / 1000  # Microseconds: the insert that triggered the largest rehash
+
+    present = rng.sample(keys, min(samples, size))
+    missing = [rng.getrandbits(64) | 1 << 64 for _ in range(samples)]  # Keys that can't be in the table
+    row['search hit'] = time_per_op(table.search, present)
+    row['search miss'] = time_per_op(table.search, missing)
+    row['modify'] = time_per_op(lambda key: table.modify(key, 1), present)
+    row['remove'] = time_per_op(table.remove, present)
+    return row
+
+def memory(size):
+    # Bytes allocated per record by each table type holding size 64-bit keys with small values,
+    # and the time to rehash the full table into double the capacity. The keys are made while
+    # memory is traced, as a search hashing positions would, so a table that keeps the key objects
+    # alive is charged for them and one that copies them into an array is not
+    print()
+    print("{:>18} {:>14} {:>14}".format("table", "bytes/record", "rehash (ms)"))
+    for table_type in (HashTable, CompactHashTable, IntHashTable):
+        rng = random.Random(0)
+        gc.collect()
+        tracemalloc.start()
+        table = table_type()
+        for _ in range(size):
+            table.insert(rng.getrandbits(64), 1)
+        allocated = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        start = time.perf_counter()
+        table.rehash(table.capacity() * 2)
+        rehash = time.perf_counter() - start
+        print("{:>18} {:>14.1f} {:>14.0f}".format(table_type.__name__, allocated / size, rehash * 1000))
+        del table
+
+def probe_lengths(largest, samples=20000):
+    # Probe lengths and lookup times of linear probing and Robin Hood hashing just below the 0.7
+    # load factor that triggers a resize, where linear probing clusters the most
+    capacity = 32
+    while capacity * 2 * 0.7 <= largest:
+        capacity *= 2
+    size = int(capacity * 0.7)
+    rng = random.Random(1)
+    keys = [rng.getrandbits(64) for _ in range(size)]
+    missing = [rng.getrandbits(64) | 1 << 64 for _ in range(samples)]
+    present = rng.sample(keys, min(samples, size))
+    print()
+    print("{} records in {} slots".format(size, capacity))
+    print("{:>18} {:>12} {:>12} {:>12} {:>12}".format("table", "max probe", "mean probe", "hit (ns)", "miss (ns)"))
+    for table_type in (HashTable, CompactHashTable, RobinHoodHashTable):
+        table = table_type(capacity)
+        for key in keys:
+            table.insert(key, 0)
+        longest, mean = table.probe_stats()
+        print("{:>18} {:>12} {:>12.2f} {:>12.0f} {:>12.0f}".format(table_type.__name__, longest, mean,
+              time_per_op(table.search, present), time_per_op(table.search, missing)))
+
+def bulk_load(size):
+    # Time to load size pairs one insert at a time and with from_items, which sizes the table once
+    rng = random.Random(2)
+    items = [(rng.getrandbits(64), i) for i in range(size)]
+    print()
+    print("{:>18} {:>14} {:>14}".format("table", "insert (s)", "from_items (s)"))
+    for table_type in (HashTable, CompactHashTable, IntHashTable, RobinHoodHashTable):
+        table = table_type()
+        start = time.perf_counter()
+        for key, value in items:
+            table.insert(key, value)
+        one_by_one = time.perf_counter() - start
+        start = time.perf_counter()
+        table_type.from_items(items)
+        bulk = time.perf_counter() - start
+        print("{:>18} {:>14.2f} {:>14.2f}".format(table_type.__name__, one_by_one, bulk))
+
+def mapped(size):
+    # Time to save size records to a file and to open it with MappedHashTable, then lookup times on the
+    # freshly opened file. Opening doesn't read the slots, so it shouldn't depend on the size
+    rng = random.Random(3)
+    items = [(rng.getrandbits(64), i) for i in range(size)]
+    present = [key for key, _ in rng.sample(items, min(20000, size))]
+    table = IntHashTable.from_items(items)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'table')
+        start = time.perf_counter()
+        table.save(path)
+        saved = time.perf_counter() - start
+        start = time.perf_counter()
+        mapped_table = MappedHashTable(path)
+        opened = time.perf_counter() - start
+        lookup = time_per_op(mapped_table.search, present)
+        mapped_table.close()
+        print()
+        print("file of {} records, {:.1f} MB: saved in {:.2f} s, opened in {:.3f} ms, {:.0f} ns per lookup".format(
+              size, os.path.getsize(path) / 1e6, saved, opened * 1000, lookup))
+
+class LockedHashTable:
+    # A HashTable behind one lock, what ShardedHashTable is compared against
+    def __init__(self):
+        self.table = HashTable()
+        self.lock = threading.Lock()
+
+    def insert(self, key, value):
+        with self.lock:
+            return self.table.insert(key, value)
+
+    def remove(self, key):
+        with self.lock:
+            return self.table.remove(key)
+
+    def search(self, key):
+        with self.lock:
+            return self.table.search(key)
+
+def threaded(size, operations=200000):
+    # Operations per second of threads sharing one table, 90% searches and 10% inserts and removes
+    rng = random.Random(4)
+    keys = [rng.getrandbits(64) for _ in range(max(size // 10, 1000))]
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print()
+    print("threads sharing a table of {} keys (GIL {}, {} CPUs)".format(len(keys), "on" if gil else "off",
+          os.cpu_count()))
+    print("{:>18} ".format("threads") + " ".join("{:>10}".format(count) for count in (1, 2, 4, 8))
+          + "   (operations/s)")
+    for table_type in (LockedHashTable, ShardedHashTable):
+        rates = []
+        for count in (1, 2, 4, 8):
+            table = table_type()
+            for key in keys:
+                table.insert(key, 0)
+
+            def work(seed, share=operations // count):
+                local = random.Random(seed)
+                for _ in range(share):
+                    key = keys[local.randrange(len(keys))]
+                    action = local.random()
+                    if action < 0.05:
+                        table.remove(key)
+                    elif action < 0.1:
+                        table.insert(key, 0)
+                    else:
+                        table.search(key)
+
+            workers = [threading.Thread(target=work, args=(seed,)) for seed in range(count)]
+            start = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            rates.append(operations / (time.perf_counter() - start))
+        print("{:>18} ".format(table_type.__name__) + " ".join("{:>10.0f}".format(rate) for rate in rates))
+
+def main():
+    largest = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    sizes = []
+    size = 1000
+    while size <= largest:
+        sizes.append(size)
+        size *= 10
+    columns = ['insert full', 'insert incr', 'search hit', 'search miss', 'modify', 'remove',
+               'max full', 'max incr']
+    print("{:>10} ".format("records") + " ".join("{:>12}".format(name) for name in columns) + "   (ns/op, max in us)")
+    for size in sizes:
+        row = bench(size)
+        print("{:>10} ".format(size) + " ".join("{:>12.0f}".format(row[name]) for name in columns))
+    memory(sizes[-1])
+    probe_lengths(sizes[-1])
+    bulk_load(sizes[-1])
+    mapped(sizes[-1])
+    threaded(sizes[-1])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+#
+#   Benchmark of the Monte Carlo tree search player: playouts per second from the
+#   opening and from a crowded midgame position on the game's 5 x 6 board, for a fixed
+#   number of playouts and for a one-second time limit, and the root visits kept by
+#   tree reuse when the opponent answers with the reply the search expected.
+#   To use this, run: python bench_mcts.py [playouts, default 2000]
+
+import sys
+import time
+from compact_board import CompactBoard
+from mcts import MCTSPlayer
+
+def opening():
+    board = [[0] * 6 for _ in range(5)]
+    board[0][0] = 1
+    board[4][5] = -1
+    return board
+
+def midgame():
+    return [[1, 2, -1, 0, 1, -1],
+            [-2, 0, 3, -1, 2, 0],
+            [0, 3, -2, 1, 0, -2],
+            [1, 0, 2, -3, 1, 0],
+            [0, -1, 0, 2, -2, -1]]
+
+def rate(board, **options):
+    # Playouts per second of one get_play, and the move it picked
+    bot = MCTSPlayer(seed=0, **options)
+    start = time.perf_counter()
+    move = bot.get_play(board)
+    return bot.playouts_done / (time.perf_counter() - start), bot.playouts_done, move
+
+def reuse(board, playouts):
+    # Visits inherited by the second move when the opponent plays the most visited reply
+    bot = MCTSPlayer(playouts=playouts, seed=0)
+    row, col = bot.get_play(board)
+    child = next(node for node in bot.root.children if node.move == row * 6 + col)
+    reply = max(child.children, key=lambda node: node.visits)
+    state = CompactBoard.from_grid(board)
+    state.make_move(child.move, 1)
+    state.overflow()
+    state.make_move(reply.move, -1)
+    state.overflow()
+    bot.get_play(state.to_grid())
+    return bot.reused_visits
+
+def main():
+    playouts = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print("{:>10} {:>16} {:>12} {:>12} {:>8}".format("position", "budget", "playouts", "playouts/s", "move"))
+    for name, board in (("opening", opening()), ("midgame", midgame())):
+        for budget, options in (("{} playouts".format(playouts), {'playouts': playouts}),
+                                ("1 s", {'time_limit': 1.0})):
+            per_second, done, move = rate(board, **options)
+            print("{:>10} {:>16} {:>12} {:>12.0f} {:>8}".format(name, budget, done, per_second, str(move)))
+    print()
+    print("tree reuse from the opening: {} of the root visits kept".format(reuse(opening(), playouts)))
+
+if __name__ == '__main__':
+    main()
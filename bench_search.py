@@ -0,0 +1,60 @@
+#
+#   Benchmark of move ordering in the GameTree alpha-beta search: nodes visited, cutoffs,
+#   the share of cutoffs caused by the first move searched (the closer to 100% the better
+#   the ordering) and the time per move, with and without ordering, over random game
+#   positions on the 5 x 6 board. The fixed depth searches run without a transposition
+#   table; the iteratively deepened ones use one, so the best move of each depth is tried
+#   first at the next. Both always pick the same move.
+#   To use this, run: python bench_search.py [positions, default 20]
+
+import random
+import sys
+import time
+from a2_partb import GameTree
+from compact_board import CompactBoard
+from transposition import TranspositionTable
+
+def positions(count, seed=0):
+    # Random boards with both players on them, and the player to move
+    rng = random.Random(seed)
+    capacity = CompactBoard(5, 6).capacity
+    for _ in range(count):
+        board = [[rng.choice([0, 0, rng.randint(-capacity[row * 6 + col], capacity[row * 6 + col])])
+                  for col in range(6)] for row in range(5)]
+        board[0][0] = board[0][0] or 1
+        board[4][5] = board[4][5] or -1
+        yield board, rng.choice([1, -1])
+
+def run(boards, depth, ordering, deepening):
+    # Totals of nodes visited, cutoffs, first move cutoffs and seconds over the boards
+    totals = [0, 0, 0, 0.0]
+    for board, player in boards:
+        if deepening:
+            tree = GameTree(board, player, search='alphabeta', ordering=ordering,
+                            transposition_table=TranspositionTable(1 << 20), time_limit=3600, max_depth=depth)
+        else:
+            tree = GameTree(board, player, tree_height=depth + 1, search='alphabeta', ordering=ordering)
+        start = time.perf_counter()
+        tree.get_move()
+        totals[3] += time.perf_counter() - start
+        totals[0] += tree.nodes_visited
+        totals[1] += tree.cutoffs
+        totals[2] += tree.first_move_cutoffs
+    return totals
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    boards = list(positions(count))
+    print("{} positions".format(count))
+    print("{:>22} {:>10} {:>12} {:>10} {:>12} {:>12}".format("search", "ordering", "nodes", "cutoffs",
+                                                              "first move", "ms/move"))
+    for depth, deepening in ((3, False), (4, False), (4, True)):
+        name = "depth {}{}".format(depth, ", deepening + TT" if deepening else "")
+        for ordering in (False, True):
+            nodes, cutoffs, first, seconds = run(boards, depth, ordering, deepening)
+            print("{:>22} {:>10} {:>12} {:>10} {:>11.0f}% {:>12.1f}".format(
+                name, "on" if ordering else "off", nodes, cutoffs, 100 * first / max(cutoffs, 1),
+                seconds / count * 1000))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+from array import array
+from a1_partd import shape_tables
+
+
+class CompactBoard:
+    """
+    A board stored as one flat array of signed bytes, row by row.
+
+    Moves and overflows change the board in place and record the old value of
+    every cell they write in an undo log, so a search can play a move, look at
+    the result and take the move back without ever copying the board.
+
+    Running totals are updated by every write, so they can be read in O(1)
+    instead of scanning the board:
+    value counts (how many cells hold each value), and for each player (indexed
+    by 1 and -1) the number of cells owned, the material (pieces on those cells)
+    and the threats (cells one piece away from overflowing).
+    """
+
+    def __init__(self, rows, cols, cells=None):
+        """
+        Args:
+        rows (int): Number of rows of the board.
+        cols (int): Number of columns of the board.
+        cells (Iterable[int]): Cell values in row-major order (default is an empty board).
+        """
+        self.rows = rows
+        self.cols = cols
+        self.cells = array('b', cells) if cells is not None else array('b', bytes(rows * cols))
+        if len(self.cells) != rows * cols:
+            raise ValueError("expected {} cells, got {}".format(rows * cols, len(self.cells)))
+        self.capacity, self.neighbors = shape_tables(rows, cols)  # Shared by every board of this shape
+        self.history = []  # Undo log of (cell index, old value) pairs
+        self.value_counts = array('i', bytes(4 * 256))  # Number of cells holding each value, offset by 128
+        self.cell_count = [0, 0, 0]  # Cells owned by player 1 at [1] and player -1 at [-1]
+        self.material = [0, 0, 0]  # Pieces owned by player 1 at [1] and player -1 at [-1]
+        self.threats = [0, 0, 0]  # Cells at capacity owned by player 1 at [1] and player -1 at [-1]
+        for index in range(len(self.cells)):
+            self._count(index, self.cells[index], 1)
+
+    @classmethod
+    def from_grid(cls, grid):
+        """
+        Builds a compact board from a list-of-lists grid.
+
+        Args:
+        grid (List[List[int]]): The grid to convert.
+
+        Returns:
+        CompactBoard: A board holding a copy of the grid's values.
+        """
+        return cls(len(grid), len(grid[0]), [value for row in grid for value in row])
+
+    def to_grid(self):
+        """
+        Converts the board to the list-of-lists format used by Board.get_board().
+
+        Returns:
+        List[List[int]]: A new grid holding the board's values.
+        """
+        cells = self.cells
+        cols = self.cols
+        return [cells[i:i + cols].tolist() for i in range(0, len(cells), cols)]
+
+    @classmethod
+    def from_bytes(cls, data, cols):
+        """
+        Rebuilds a board packed by to_bytes.
+
+        Args:
+        data (bytes): The packed cells.
+        cols (int): Number of columns of the board.
+
+        Returns:
+        CompactBoard: The unpacked board.
+        """
+        cells = array('b')
+        cells.frombytes(data)
+        return cls(len(cells) // cols, cols, cells)
+
+    def to_bytes(self):
+        """
+        Packs the cells into bytes, one signed byte per cell, e.g. to send to another process.
+
+        Returns:
+        bytes: The packed cells.
+        """
+        return self.cells.tobytes()
+
+    def copy(self):
+        """
+        Returns:
+        CompactBoard: An independent board with the same cells and an empty undo log.
+        """
+        return CompactBoard(self.rows, self.cols, self.cells)
+
+    def index(self, row, col):
+        """
+        Returns:
+        int: The row-major index of a cell.
+        """
+        return row * self.cols + col
+
+    def get(self, row, col):
+        """
+        Returns:
+        int: The value of a cell.
+        """
+        return self.cells[row * self.cols + col]
+
+    def count(self, value):
+        """
+        Returns:
+        int: The number of cells holding the value.
+        """
+        return self.value_counts[value + 128]
+
+    def _count(self, index, value, delta):
+        # Add (delta 1) or remove (delta -1) a cell's value from the running totals
+        self.value_counts[value + 128] += delta
+        if value != 0:
+            sign = 1 if value > 0 else -1
+            self.cell_count[sign] += delta
+            self.material[sign] += delta * abs(value)
+            if abs(value) == self.capacity[index]:
+                self.threats[sign] += delta
+
+    def write(self, index, value):
+        """
+        Sets a cell, logging its old value for unmake_move and updating the running totals.
+
+        Args:
+        index (int): Row-major index of the cell.
+        value (int): The new value of the cell.
+        """
+        old = self.cells[index]
+        self.history.append((index, old))
+        self._count(index, old, -1)
+        self.cells[index] = value
+        self._count(index, value, 1)
+
+    def make_move(self, index, player):
+        """
+        Adds one of the player's pieces to a cell, as Board.add_piece does. Overflow
+        is not resolved; call overflow() for that.
+
+        Args:
+        index (int): Row-major index of the cell.
+        player (int): The player adding the piece (1 or -1).
+
+        Returns:
+        int: Undo marker to pass to unmake_move.
+        """
+        marker = len(self.history)
+        self.write(index, self.cells[index] + player)
+        return marker
+
+    def unmake_move(self, marker):
+        """
+        Restores every cell changed since make_move returned the marker, including
+        cells changed by overflow().
+
+        Args:
+        marker (int): Undo marker returned by make_move.
+        """
+        history = self.history
+        cells = self.cells
+        while len(history) > marker:
+            index, value = history.pop()
+            self._count(index, cells[index], -1)
+            cells[index] = value
+            self._count(index, value, 1)
+
+    def changes_since(self, marker):
+        """
+        Lists the cells whose value differs from what it was when the marker was taken.
+
+        Args:
+        marker (int): Undo marker returned by make_move.
+
+        Returns:
+        List[Tuple[int, int, int]]: (index, old value, new value) of every changed cell.
+        """
+        first = {}
+        for index, old in self.history[marker:]:
+            first.setdefault(index, old)
+        cells = self.cells
+        return [(index, old, cells[index]) for index, old in first.items() if cells[index] != old]
+
+    def all_same_sign(self):
+        """
+        Returns:
+        bool: True if no two non-zero cells have different signs.
+        """
+        return self.cell_count[1] == 0 or self.cell_count[-1] == 0
+
+    def overflow(self, cache=None):
+        """
+        Resolves overflow in place, with the same rules as a1_partd.overflow: while
+        some cell holds more pieces than it has neighbours and both players are on
+        the board, every overflowing cell is emptied and each of its neighbours gains
+        a piece and takes the overflowing cell's sign. Changed cells are logged, so
+        unmake_move also takes back the overflow.
+
+        Args:
+        cache (OverflowCache): Optional cache to look the result up in and store it to.
+        Positions where nothing overflows are not looked up.
+
+        Returns:
+        int: The number of waves of overflow.
+        """
+        cells = self.cells
+        capacity = self.capacity
+        neighbors = self.neighbors
+        write = self.write
+        overflowing = [i for i in range(len(cells)) if abs(cells[i]) > capacity[i]]
+        if not overflowing or self.all_same_sign():
+            return 0
+        if cache is not None:
+            key = (self.cols, cells.tobytes())
+            entry = cache.lookup(key)
+            if entry is not None:
+                result, waves = entry
+                for i, value in enumerate(memoryview(result).cast('b')):
+                    if cells[i] != value:
+                        write(i, value)
+                return waves
+        waves = 0
+        while overflowing and not self.all_same_sign():
+            signs = [1 if cells[i] > 0 else -1 for i in overflowing]
+            for i in overflowing:
+                write(i, 0)
+            for i, sign in zip(overflowing, signs):
+                for j in neighbors[i]:
+                    write(j, (abs(cells[j]) + 1) * sign)
+            waves += 1
+            overflowing = [i for i in range(len(cells)) if abs(cells[i]) > capacity[i]]
+        if cache is not None:
+            cache.store(key, cells.tobytes(), waves)
+        return waves
+
+    def __eq__(self, other):
+        return isinstance(other, CompactBoard) and self.cols == other.cols and self.cells == other.cells
+
+    def __repr__(self):
+        return "CompactBoard({})".format(self.to_grid())
+
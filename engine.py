@@ -0,0 +1,222 @@
+#   Headless game engine: the board rules of game.py and bot-vs-bot matches played to the end
+#   with no window, sound or pygame at all. game.py draws this same Board.
+#   To play a batch of games, run: python engine.py [options], e.g.
+#   python engine.py --games 1000 --bots random alphabeta --opening 2
+#   It reports the win rate of each bot, the game length and the moves played per second.
+
+import argparse
+import random
+import time
+from a1_partc import Queue
+from a1_partd import overflow, apply_delta, shape_tables
+
+# Board size used by game.py, as (rows, cols)
+GRID_SIZE = (5, 6)
+
+# Bots the self-play runner can create, see make_bot
+BOT_KINDS = ('random', 'alphabeta', 'minimax', 'mcts')
+
+# Board class for managing the game board
+class Board:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.board = [[0 for _ in range(width)] for _ in range(height)]
+        self.board[0][0] = 1
+        self.board[self.height - 1][self.width - 1] = -1
+        self.turn = 0
+        # Build the overflow tables for this board size now, rather than during the first overflow
+        shape_tables(height, width)
+
+    def get_board(self):
+        # Return a copy of the current game board
+        current_board = []
+        for i in range(self.height):
+            current_board.append(self.board[i].copy())
+        return current_board
+
+    def valid_move(self, row, col, player):
+        # Check if a move is valid
+        if row >= 0 and row < self.height and col >= 0 and col < self.width and (self.board[row][col] == 0 or self.board[row][col] / abs(self.board[row][col]) == player):
+            return True
+        return False
+
+    def add_piece(self, row, col, player):
+        # Add a piece to the game board
+        if self.valid_move(row, col, player):
+            self.board[row][col] += player
+            self.turn += 1
+            return True
+        return False
+
+    def check_win(self):
+        # Check if there is a winner
+        if self.turn > 0:
+            num_p1 = 0
+            num_p2 = 0
+            for i in range(self.height):
+                for j in range(self.width):
+                    if self.board[i][j] > 0:
+                        if num_p2 > 0:
+                            return 0
+                        num_p1 += 1
+                    elif self.board[i][j] < 0:
+                        if num_p1 > 0:
+                            return 0
+                        num_p2 += 1
+            if num_p1 == 0:
+                return -1
+            if num_p2 == 0:
+                return 1
+        return 0
+
+    def do_overflow(self, q):
+        # Perform overflow on the game board. Each step is queued as the cells it changed,
+        # to be replayed one at a time with apply_delta
+        oldboard = []
+        for i in range(self.height):
+            oldboard.append(self.board[i].copy())
+        numsteps = overflow(self.board, q, deltas=True)
+        if numsteps != 0:
+            self.set(oldboard)
+        return numsteps
+
+    def apply_delta(self, delta):
+        # Apply one overflow step given as a list of (row, col, new value) changes
+        apply_delta(self.board, delta)
+
+    def set(self, newboard):
+        # Set the game board to a new state
+        for row in range(self.height):
+            for col in range(self.width):
+                self.board[row][col] = newboard[row][col]
+
+class RandomPlayer:
+    # A bot that plays a random valid move, as a baseline for the other bots
+    def __init__(self, player, name="Random Bot", seed=None):
+        self.player = player
+        self.name = name
+        self.random = random.Random(seed)
+
+    def get_name(self):
+        return self.name
+
+    def get_play(self, board):
+        moves = [(row, col) for row in range(len(board)) for col in range(len(board[0]))
+                 if board[row][col] * self.player >= 0]
+        return self.random.choice(moves)
+
+def make_bot(kind, player, seed=None):
+    # Create a bot of one of the BOT_KINDS playing as player (1 moves first, -1 second). The search bots
+    # are imported here so the engine itself doesn't need them
+    if kind == 'random':
+        return RandomPlayer(player, seed=seed)
+    if kind in ('alphabeta', 'minimax'):
+        if player == 1:
+            from player1 import PlayerOne
+            return PlayerOne(search=kind)
+        from player2 import PlayerTwo
+        return PlayerTwo(search=kind)
+    if kind == 'mcts':
+        from mcts import MCTSPlayer
+        return MCTSPlayer(player=player, playouts=500, seed=seed)
+    raise ValueError("unknown bot: {}".format(kind))
+
+def play_game(bots, grid_size=GRID_SIZE, max_moves=400, opening=0, rng=None):
+    # Play one game to the end the way game.py does, without drawing it: the bots take turns, every
+    # move's overflow is resolved wave by wave, and a bot that returns an invalid move (or raises) loses.
+    # bots[0] plays player 1 and moves first, bots[1] plays player -1. The first opening moves are
+    # random valid moves instead of the bots', so deterministic bots don't play the same game every time.
+    # A game still going after max_moves is a draw.
+    # Returns (winner, moves, seconds the bots took, moves the bots were asked for): winner is 1, -1 or 0
+    # for a draw. The opening moves are neither timed nor counted as the bots'
+    rows, cols = grid_size
+    board = Board(cols, rows)
+    player_id = [1, -1]
+    rng = rng or random.Random()
+    overflow_boards = Queue()
+    current_player = 0
+    thinking = 0.0
+    bot_moves = 0
+    moves = 0
+    while moves < max_moves:
+        player = player_id[current_player]
+        if moves < opening:
+            row, col = rng.choice([(row, col) for row in range(rows) for col in range(cols)
+                                   if board.valid_move(row, col, player)])
+        else:
+            start = time.perf_counter()
+            try:
+                row, col = bots[current_player].get_play(board.get_board())
+            except Exception:
+                row, col = -1, -1  # A bot that fails to return a move forfeits, as in game.py
+            thinking += time.perf_counter() - start
+            bot_moves += 1
+        if not board.add_piece(row, col, player):
+            return -player, moves, thinking, bot_moves
+        moves += 1
+        if board.do_overflow(overflow_boards) != 0:
+            # Replay every step of the overflow, as the game does between frames
+            while not overflow_boards.is_empty():
+                board.apply_delta(overflow_boards.dequeue())
+        winner = board.check_win()
+        if winner != 0:
+            return winner, moves, thinking, bot_moves
+        current_player = (current_player + 1) % 2
+    return 0, moves, thinking, bot_moves
+
+def self_play(kinds, games, max_moves=400, opening=0, seed=0):
+    # Play a batch of games between two kinds of bot, swapping who moves first every game.
+    # Returns a dict of the results: wins of each kind, draws, and the totals of moves, bot moves and time
+    rng = random.Random(seed)
+    results = {'wins': [0, 0], 'draws': 0, 'moves': 0, 'thinking': 0.0, 'bot_moves': 0, 'games': games,
+               'first_player_wins': 0}
+    start = time.perf_counter()
+    for game in range(games):
+        first = game % 2  # Index in kinds of the bot playing player 1
+        order = [first, 1 - first]
+        bots = [make_bot(kinds[order[0]], 1, rng.randrange(1 << 30)),
+                make_bot(kinds[order[1]], -1, rng.randrange(1 << 30))]
+        winner, moves, thinking, bot_moves = play_game(bots, max_moves=max_moves, opening=opening, rng=rng)
+        for bot in bots:
+            if hasattr(bot, 'close'):
+                bot.close()
+        if winner == 0:
+            results['draws'] += 1
+        else:
+            results['wins'][order[0] if winner == 1 else order[1]] += 1
+            if winner == 1:
+                results['first_player_wins'] += 1
+        results['moves'] += moves
+        results['thinking'] += thinking
+        results['bot_moves'] += bot_moves
+    results['seconds'] = time.perf_counter() - start
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Play bots against each other without a window and report the results.")
+    parser.add_argument('--games', type=int, default=100, help="number of games to play (default 100)")
+    parser.add_argument('--bots', nargs=2, choices=BOT_KINDS, default=['random', 'random'],
+                        help="the two bots, which take turns moving first (default random random)")
+    parser.add_argument('--opening', type=int, default=0,
+                        help="random moves played at the start of every game (default 0)")
+    parser.add_argument('--max-moves', type=int, default=400,
+                        help="moves after which a game is a draw (default 400)")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the openings and random bots (default 0)")
+    args = parser.parse_args()
+
+    results = self_play(args.bots, args.games, args.max_moves, args.opening, args.seed)
+    games = results['games']
+    print("{} games of {} against {}".format(games, args.bots[0], args.bots[1]))
+    for index, kind in enumerate(args.bots):
+        print("{:>16} {:>6} wins {:>6.1f}%".format("{} ({})".format(kind, "A" if index == 0 else "B"),
+                                                   results['wins'][index], 100 * results['wins'][index] / games))
+    print("{:>16} {:>6}      {:>6.1f}%".format("draws", results['draws'], 100 * results['draws'] / games))
+    print("first player won {:.1f}% of the decided games".format(
+        100 * results['first_player_wins'] / max(games - results['draws'], 1)))
+    print("average game length {:.1f} moves".format(results['moves'] / games))
+    print("{:.0f} moves/s overall, {:.3f} ms per bot move".format(
+        results['moves'] / results['seconds'], 1000 * results['thinking'] / max(results['bot_moves'], 1)))
+
+if __name__ == '__main__':
+    main()
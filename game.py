@@ -13,7 +13,8 @@ import pygame
 import sys
 import math
 import random
-from a1_partd import overflow
+from concurrent.futures import ThreadPoolExecutor
+import engine
 from a1_partc import Queue
 from player1 import PlayerOne
 from player2 import PlayerTwo
@@ -46,75 +47,13 @@ class Dropdown:
         # Return the current selected option
         return self.current_option
 
-# Board class for managing the game board
-class Board:
+# Board class for managing the game board. The rules are in engine.Board, shared with headless games;
+# this adds the sprites and drawing
+class Board(engine.Board):
     def __init__(self, width, height, p1_sprites, p2_sprites):
-        self.width = width
-        self.height = height
-        self.board = [[0 for _ in range(width)] for _ in range(height)]
+        super().__init__(width, height)
         self.p1_sprites = p1_sprites
         self.p2_sprites = p2_sprites
-        self.board[0][0] = 1
-        self.board[self.height - 1][self.width - 1] = -1
-        self.turn = 0
-
-    def get_board(self):
-        # Return a copy of the current game board
-        current_board = []
-        for i in range(self.height):
-            current_board.append(self.board[i].copy())
-        return current_board
-
-    def valid_move(self, row, col, player):
-        # Check if a move is valid
-        if row >= 0 and row < self.height and col >= 0 and col < self.width and (self.board[row][col] == 0 or self.board[row][col] / abs(self.board[row][col]) == player):
-            return True
-        return False
-
-    def add_piece(self, row, col, player):
-        # Add a piece to the game board
-        if self.valid_move(row, col, player):
-            self.board[row][col] += player
-            self.turn += 1
-            return True
-        return False
-
-    def check_win(self):
-        # Check if there is a winner
-        if self.turn > 0:
-            num_p1 = 0
-            num_p2 = 0
-            for i in range(self.height):
-                for j in range(self.width):
-                    if self.board[i][j] > 0:
-                        if num_p2 > 0:
-                            return 0
-                        num_p1 += 1
-                    elif self.board[i][j] < 0:
-                        if num_p1 > 0:
-                            return 0
-                        num_p2 += 1
-            if num_p1 == 0:
-                return -1
-            if num_p2 == 0:
-                return 1
-        return 0
-
-    def do_overflow(self, q):
-        # Perform overflow on the game board
-        oldboard = []
-        for i in range(self.height):
-            oldboard.append(self.board[i].copy())
-        numsteps = overflow(self.board, q)
-        if numsteps != 0:
-            self.set(oldboard)
-        return numsteps
-
-    def set(self, newboard):
-        # Set the game board to a new state
-        for row in range(self.height):
-            for col in range(self.width):
-                self.board[row][col] = newboard[row][col]
 
     def draw(self, window, frame):
         # Draw the game board
@@ -223,6 +162,8 @@ X_OFFSET = 0
 Y_OFFSET = 100
 FULL_DELAY = 5
 TURN_TIME_LIMIT = 5  # 5 seconds per turn
+BOT_TIME_LIMIT = TURN_TIME_LIMIT - 1  # Bots search until this many seconds have passed, leaving room to play the move
+FPS = 10  # Frames drawn per second, the speed the sprite and overflow animations are made for
 
 # Initialize Pygame
 pygame.init()
@@ -267,15 +208,30 @@ overflow_boards = Queue()
 overflowing = False
 numsteps = 0
 has_winner = False
-bots = [PlayerOne(), PlayerTwo()]
+bots = [PlayerOne(time_limit=BOT_TIME_LIMIT), PlayerTwo(time_limit=BOT_TIME_LIMIT)]
+# Bots search on a worker thread so the window keeps drawing and the turn timer keeps running while they
+# think. A thread rather than a process, because the bots keep their search tables between moves
+bot_executor = ThreadPoolExecutor(max_workers=1)
+bot_future = None  # The running bot search, polled every frame
 grid_col = -1
 grid_row = -1
 choice = [None, None]
 particles = []
 scores = [0, 0]  # Initialize scores for both players
 turn_timer = TURN_TIME_LIMIT
+clock = pygame.time.Clock()
+
+def cancel_bot():
+    # Stop the running bot search, if any. The worker thread can't be killed, so the bot is asked to stop
+    # and its move, if it still comes, is ignored
+    global bot_future
+    if bot_future is not None:
+        if not bot_future.cancel():
+            bots[current_player].cancel()
+        bot_future = None
 
 while running:
+    clicked = False  # Whether a cell was clicked this frame
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             running = False
@@ -289,64 +245,85 @@ while running:
                 row = y - Y_OFFSET
                 col = x - X_OFFSET
                 grid_row, grid_col = row // CELL_SIZE, col // CELL_SIZE
-                win = board.check_win()
-                if win != 0:
-                    winner = 1
-                    if win == -1:
-                        winner = 2
-                    has_winner = True
-                    win_sound.play()  # Play win sound
-
-                if not has_winner:
-                    if overflowing:
-                        status[0] = "Overflowing"
-                        if not overflow_boards.is_empty():
-                            if repeat_step == FULL_DELAY:
-                                next = overflow_boards.dequeue()
-                                board.set(next)
-                                repeat_step = 0
-                            else:
-                                repeat_step += 1
-                        else:
-                            overflowing = False
-                            current_player = (current_player + 1) % 2
-                            turn_timer = TURN_TIME_LIMIT
+                clicked = True
+
+    # Play the game one step per frame: an overflow wave, a human's click or a bot's finished search
+    if not has_winner:
+        win = board.check_win()
+        if win != 0:
+            winner = 1
+            if win == -1:
+                winner = 2
+            has_winner = True
+            win_sound.play()  # Play win sound
+
+    if not has_winner:
+        if overflowing:
+            status[0] = "Overflowing"
+            if not overflow_boards.is_empty():
+                if repeat_step == FULL_DELAY:
+                    next = overflow_boards.dequeue()
+                    board.apply_delta(next)
+                    repeat_step = 0
+                else:
+                    repeat_step += 1
+            else:
+                overflowing = False
+                current_player = (current_player + 1) % 2
+                turn_timer = TURN_TIME_LIMIT
+        else:
+            status[0] = "Player " + str(current_player + 1) + "'s turn"
+            make_move = False
+            if choice[current_player] != 1 and bot_future is not None:
+                cancel_bot()  # The player was switched to a human while the bot was thinking
+            if choice[current_player] == 1:
+                if bot_future is None:
+                    bot_future = bot_executor.submit(bots[current_player].get_play, board.get_board())
+                    status[1] = "Bot is thinking"
+                elif bot_future.done():
+                    try:
+                        (grid_row, grid_col) = bot_future.result()
+                    except Exception:
+                        (grid_row, grid_col) = (-1, -1)  # A bot that fails to return a move forfeits, like one returning an invalid move
+                    bot_future = None
+                    status[1] = "Bot chose row {}, col {}".format(grid_row, grid_col)
+                    if not board.valid_move(grid_row, grid_col, player_id[current_player]):
+                        has_winner = True
+                        winner = ((current_player + 1) % 2) + 1
                     else:
-                        status[0] = "Player " + str(current_player + 1) + "'s turn"
-                        make_move = False
-                        if choice[current_player] == 1:
-                            (grid_row, grid_col) = bots[current_player].get_play(board.get_board())
-                            status[1] = "Bot chose row {}, col {}".format(grid_row, grid_col)
-                            if not board.valid_move(grid_row, grid_col, player_id[current_player]):
-                                has_winner = True
-                                winner = ((current_player + 1) % 2) + 1
-                            else:
-                                make_move = True
-                        else:
-                            if board.valid_move(grid_row, grid_col, player_id[current_player]):
-                                make_move = True
-
-                        if make_move:
-                            board.add_piece(grid_row, grid_col, player_id[current_player])
-                            scores[current_player] += 10  # Example scoring logic
-                            move_sound.play()  # Play move sound
-                            numsteps = board.do_overflow(overflow_boards)
-                            if numsteps != 0:
-                                overflowing = True
-                                repeat_step = 0
-                            else:
-                                animate_piece_drop(window, p1_sprites[0] if player_id[current_player] == 1 else p2_sprites[0], (grid_col * CELL_SIZE + X_OFFSET, 0), (grid_col * CELL_SIZE + X_OFFSET, grid_row * CELL_SIZE + Y_OFFSET))
-                                particles.extend(create_particles(grid_col * CELL_SIZE + X_OFFSET + CELL_SIZE // 2, grid_row * CELL_SIZE + Y_OFFSET + CELL_SIZE // 2))
-                                current_player = (current_player + 1) % 2
-                                turn_timer = TURN_TIME_LIMIT
-                            grid_row = -1
-                            grid_col = -1
-
-    # Update timer
-    turn_timer -= 1 / 60  # Assuming 60 FPS
-    if turn_timer <= 0:
-        current_player = (current_player + 1) % 2
-        turn_timer = TURN_TIME_LIMIT
+                        make_move = True
+            elif clicked:
+                if board.valid_move(grid_row, grid_col, player_id[current_player]):
+                    make_move = True
+
+            if make_move:
+                board.add_piece(grid_row, grid_col, player_id[current_player])
+                scores[current_player] += 10  # Example scoring logic
+                move_sound.play()  # Play move sound
+                numsteps = board.do_overflow(overflow_boards)
+                if numsteps != 0:
+                    overflowing = True
+                    repeat_step = 0
+                else:
+                    animate_piece_drop(window, p1_sprites[0] if player_id[current_player] == 1 else p2_sprites[0], (grid_col * CELL_SIZE + X_OFFSET, 0), (grid_col * CELL_SIZE + X_OFFSET, grid_row * CELL_SIZE + Y_OFFSET))
+                    particles.extend(create_particles(grid_col * CELL_SIZE + X_OFFSET + CELL_SIZE // 2, grid_row * CELL_SIZE + Y_OFFSET + CELL_SIZE // 2))
+                    current_player = (current_player + 1) % 2
+                    turn_timer = TURN_TIME_LIMIT
+                grid_row = -1
+                grid_col = -1
+
+    # Update timer with the time the last frame actually took
+    turn_timer -= clock.tick(FPS) / 1000
+    if turn_timer <= 0 and not has_winner and not overflowing:
+        if bot_future is not None:
+            # The bot ran over its time: stop it and it forfeits the game
+            cancel_bot()
+            status[1] = "Bot ran out of time"
+            has_winner = True
+            winner = ((current_player + 1) % 2) + 1
+        else:
+            current_player = (current_player + 1) % 2
+            turn_timer = TURN_TIME_LIMIT
 
     # Draw the game board
     window.fill((200, 200, 255))
@@ -373,7 +350,11 @@ while running:
 
     update_particles(particles, window)
     pygame.display.update()
-    pygame.time.delay(100)
 
+# Let a bot still searching stop before the worker thread is joined
+cancel_bot()
+bot_executor.shutdown()
+for bot in bots:
+    bot.close()
 pygame.quit()
 sys.exit()
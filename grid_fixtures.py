@@ -0,0 +1,24 @@
+#
+#   Boards shared by the unit tests of the overflow simulators
+#   (test_compact_board.py, test_overflow_batch.py and test_overflow_cache.py)
+
+import random
+from a1_partd import shape_tables
+
+def random_grids(count, seed=0, shape=None):
+    # Boards as they occur in a game: no cell is over capacity until a player adds a piece.
+    # Every board is shape (rows, cols), or of a random shape from 2 x 2 to 7 x 7 if shape is None
+    rng = random.Random(seed)
+    grids = []
+    while len(grids) < count:
+        rows, cols = shape or (rng.randint(2, 7), rng.randint(2, 7))
+        capacity, _ = shape_tables(rows, cols)
+        grid = [[rng.randint(-capacity[row * cols + col], capacity[row * cols + col])
+                 for col in range(cols)] for row in range(rows)]
+        player = rng.choice([1, -1])
+        moves = [(row, col) for row in range(rows) for col in range(cols) if grid[row][col] * player >= 0]
+        if moves:
+            row, col = rng.choice(moves)
+            grid[row][col] += player
+            grids.append(grid)
+    return grids
@@ -0,0 +1,245 @@
+import math
+import random
+import time
+from a1_partd import overflow_flat, shape_tables
+from compact_board import CompactBoard
+
+
+class MCTSNode:
+    """
+    A position in the Monte Carlo search tree.
+
+    Statistics are kept from the point of view of the player who made the move
+    leading to the node, which is what its parent compares when picking a child.
+    """
+
+    def __init__(self, move, player, parent=None):
+        """
+        Args:
+        move (int): Row-major index of the move that led to this node (None at the root).
+        player (int): The player to move in this position (1 or -1).
+        parent (MCTSNode): The node this one was expanded from (default is None).
+        """
+        self.move = move
+        self.player = player
+        self.parent = parent
+        self.children = []
+        self.untried = None  # Moves not expanded yet, listed the first time a playout reaches the node
+        self.visits = 0
+        self.wins = 0.0  # Playouts won by the player who made the move, draws counting one half
+        self.winner = 0  # The player who won by making the move, 0 if the game goes on
+        self.position = None  # Packed board (CompactBoard.to_bytes) of this position
+
+    def select_child(self, exploration):
+        """
+        Picks the child with the best UCT score: its win rate plus an exploration
+        bonus that grows for children visited less than their siblings.
+
+        Args:
+        exploration (float): Weight of the exploration bonus.
+
+        Returns:
+        MCTSNode: The selected child.
+        """
+        log_visits = math.log(self.visits)
+        best = None
+        best_score = float('-inf')
+        for child in self.children:
+            score = child.wins / child.visits + exploration * math.sqrt(log_visits / child.visits)
+            if score > best_score:
+                best = child
+                best_score = score
+        return best
+
+
+class MCTSPlayer:
+    """
+    A bot that picks moves with Monte Carlo tree search (UCT) instead of minimax.
+
+    Every playout walks down the tree by UCT, adds one new position, and finishes
+    the game with random moves on a flat copy of the cells, resolving overflow with
+    the game's rules. The move played is the root move visited most. The tree is kept between
+    turns: when the board passed to get_play is a position two plies below the
+    last root (our move, then the opponent's reply), that subtree and its
+    statistics become the new root.
+    """
+
+    def __init__(self, name="MCTS Bot", player=1, playouts=None, time_limit=None, exploration=1.4,
+                 max_rollout=200, seed=None):
+        """
+        Args:
+        name (str): The name shown by the game (default is "MCTS Bot").
+        player (int): The player the bot moves for, 1 or -1 (default is 1).
+        playouts (int): Playouts per move. Defaults to 2000 when no time limit is given.
+        time_limit (float): Seconds per move. With playouts too, whichever runs out first stops the search.
+        exploration (float): UCT exploration weight (default is 1.4).
+        max_rollout (int): Random moves a rollout plays before the side with more pieces is
+        counted as the winner (default is 200).
+        seed (int): Seed of the random moves, for repeatable games (default is None).
+        """
+        if playouts is None and time_limit is None:
+            playouts = 2000
+        self.name = name
+        self.player = player
+        self.playouts = playouts
+        self.time_limit = time_limit
+        self.exploration = exploration
+        self.max_rollout = max_rollout
+        self.random = random.Random(seed)
+        self.root = None  # Root of the tree searched for the last move, kept for reuse
+        self.playouts_done = 0  # Playouts run by the last get_play
+        self.reused_visits = 0  # Visits the last get_play inherited from the previous tree
+        self.cancelled = False  # Set by cancel() to stop the running search
+
+    def get_name(self):
+        return self.name
+
+    def get_play(self, board):
+        """
+        Searches the position and returns the move to play.
+
+        Args:
+        board (List[List[int]]): The current board.
+
+        Returns:
+        Tuple[int, int]: The (row, col) of the chosen move.
+        """
+        # Reset here rather than in search, so a cancel() that comes while the tree is being set up still counts
+        self.cancelled = False
+        state = CompactBoard.from_grid(board)
+        root = self.reuse_tree(state.to_bytes())
+        if root is None:
+            root = MCTSNode(None, self.player)
+            root.position = state.to_bytes()
+        self.reused_visits = root.visits
+        self.search(root, state)
+        best = max(root.children, key=lambda child: child.visits)
+        self.root = root
+        return divmod(best.move, state.cols)
+
+    def cancel(self):
+        """
+        Stops a get_play running on another thread after its current playout. It then
+        returns the best move found so far.
+        """
+        self.cancelled = True
+
+    def reuse_tree(self, position):
+        # Find the position among the grandchildren of the last root, i.e. after one of our moves and a
+        # reply, and detach it from the rest of the old tree
+        if self.root is None:
+            return None
+        for child in self.root.children:
+            for grandchild in child.children:
+                if grandchild.position == position:
+                    grandchild.parent = None
+                    return grandchild
+        return None
+
+    def search(self, root, state):
+        """
+        Runs playouts from the root until the playout count or the time limit is reached,
+        or cancel() is called.
+
+        Args:
+        root (MCTSNode): The root of the tree.
+        state (CompactBoard): The root position. It is changed during each playout and restored after.
+        """
+        deadline = None if self.time_limit is None else time.perf_counter() + self.time_limit
+        self.playouts_done = 0
+        while True:
+            self.playout(root, state)
+            self.playouts_done += 1
+            if self.cancelled or (self.playouts is not None and self.playouts_done >= self.playouts):
+                break
+            # Read the clock every few playouts only; a playout takes well under a millisecond
+            if deadline is not None and self.playouts_done % 16 == 0 and time.perf_counter() >= deadline:
+                break
+
+    def playout(self, root, state):
+        # One iteration of MCTS: select, expand, simulate, backpropagate. Every move is played on the
+        # shared state and taken back at the end
+        node = root
+        while node.winner == 0:
+            if node.untried is None:
+                node.untried = self.legal_moves(state, node.player)
+            if node.untried:
+                # Expand one untried move, chosen at random so ties between unvisited moves don't favour
+                # the top-left of the board
+                moves = node.untried
+                index = self.random.randrange(len(moves))
+                moves[index], moves[-1] = moves[-1], moves[index]
+                move = moves.pop()
+                self.play(state, move, node.player)
+                child = MCTSNode(move, -node.player, node)
+                child.position = state.to_bytes()
+                if state.all_same_sign():
+                    child.winner = node.player
+                node.children.append(child)
+                node = child
+                break
+            node = node.select_child(self.exploration)
+            self.play(state, node.move, node.parent.player)
+
+        winner = node.winner if node.winner != 0 else self.rollout(state, node.player)
+        state.unmake_move(0)
+
+        # Credit the playout to every node on the path, for the player who moved into it
+        while node is not None:
+            node.visits += 1
+            if winner == -node.player:
+                node.wins += 1
+            elif winner == 0:
+                node.wins += 0.5
+            node = node.parent
+
+    def rollout(self, state, player):
+        """
+        Plays random legal moves until one player has every piece on the board. The
+        moves are played on a plain list copy of the cells, without the undo log and
+        running totals of CompactBoard, which a rollout has no use for.
+
+        Args:
+        state (CompactBoard): The position to play from. It is not changed.
+        player (int): The player to move.
+
+        Returns:
+        int: The winner, or after max_rollout moves the player with more pieces (0 if level).
+        """
+        cells = state.cells.tolist()
+        capacity, neighbors = shape_tables(state.rows, state.cols)
+        counts = list(state.cell_count)  # Cells owned by player 1 at [1] and player -1 at [-1]
+        size = len(cells)
+        randrange = self.random.randrange
+        for _ in range(self.max_rollout):
+            # Random cells are mostly legal, so try a few before listing the legal moves
+            for _ in range(8):
+                move = randrange(size)
+                if cells[move] * player >= 0:
+                    break
+            else:
+                moves = [index for index in range(size) if cells[index] * player >= 0]
+                move = moves[randrange(len(moves))]
+            if cells[move] == 0:
+                counts[player] += 1
+            cells[move] += player
+            if abs(cells[move]) > capacity[move]:
+                overflow_flat(cells, capacity, neighbors, [move], counts)
+            if counts[-player] == 0:
+                return player
+            player = -player
+        material = sum(cells)
+        return (material > 0) - (material < 0)
+
+    @staticmethod
+    def legal_moves(state, player):
+        # Row-major indexes of the cells the player can add a piece to: empty cells or their own
+        cells = state.cells
+        return [index for index in range(len(cells)) if cells[index] * player >= 0]
+
+    @staticmethod
+    def play(state, move, player):
+        # Add the player's piece and resolve the overflow, as game.py does
+        state.make_move(move, player)
+        state.overflow()
+
@@ -0,0 +1,98 @@
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for batch simulation, not to play the game
+    np = None
+
+from a1_partd import shape_tables
+
+# (target, origin) index pairs that move the value of every cell of a batch onto the neighbour
+# on the other side: the piece a cell gets from the cell above it, from the left, from the right
+# and from below, which is also the row-major order in which a1_partd.overflow writes them
+_ALL = slice(None)
+_SHIFTS = (
+    ((_ALL, slice(1, None), _ALL), (_ALL, slice(None, -1), _ALL)),
+    ((_ALL, _ALL, slice(1, None)), (_ALL, _ALL, slice(None, -1))),
+    ((_ALL, _ALL, slice(None, -1)), (_ALL, _ALL, slice(1, None))),
+    ((_ALL, slice(None, -1), _ALL), (_ALL, slice(1, None), _ALL)),
+)
+
+
+def capacity_mask(rows, cols):
+    """
+    Returns the overflow threshold of every cell of a board shape.
+
+    A cell overflows when its absolute value is greater than its threshold, the
+    same edge and corner rule get_overflow_list applies cell by cell.
+
+    Args:
+    rows (int): Number of rows of the boards.
+    cols (int): Number of columns of the boards.
+
+    Returns:
+    numpy.ndarray: A (rows, cols) int16 array of thresholds.
+    """
+    _require_numpy()
+    capacity, _ = shape_tables(rows, cols)
+    return np.array(capacity, dtype=np.int16).reshape(rows, cols)
+
+
+def overflow_batch(boards):
+    """
+    Resolves overflow on many boards at once with the rules of a1_partd.overflow.
+
+    Every board runs the same waves as the scalar function: while it has an
+    overflowing cell and pieces of both signs, its overflowing cells are emptied
+    and each neighbour gains one piece per overflowing neighbour. Since the
+    scalar function updates neighbours in row-major order of the overflowing
+    cells, a cell takes the sign of its last overflowing neighbour in that order:
+    below, then right, then left, then above. Boards that have settled are left
+    alone while the others keep going.
+
+    Args:
+    boards (numpy.ndarray): An (N, rows, cols) integer array of boards, e.g. int8.
+    The array is not modified.
+
+    Returns:
+    Tuple[numpy.ndarray, numpy.ndarray]: The settled boards, with the same shape
+    and dtype as the input, and the number of waves of each board.
+    """
+    _require_numpy()
+    boards = np.asarray(boards)
+    if boards.ndim != 3:
+        raise ValueError("expected an (N, rows, cols) array, got shape {}".format(boards.shape))
+    count, rows, cols = boards.shape
+    capacity = capacity_mask(rows, cols)
+    current = boards.astype(np.int16)
+    waves = np.zeros(count, dtype=np.int64)
+
+    while True:
+        over = np.abs(current) > capacity
+        flat = current.reshape(count, -1)
+        active = over.reshape(count, -1).any(axis=1) & (flat > 0).any(axis=1) & (flat < 0).any(axis=1)
+        if not active.any():
+            break
+        # Only the boards still cascading take part in the wave
+        index = np.flatnonzero(active)
+        waves[index] += 1
+        cells = current[index]
+        over = over[index]
+
+        # Sign of every overflowing cell, 0 elsewhere
+        source = np.where(over, np.sign(cells), 0).astype(np.int16)
+        received = np.zeros_like(cells)
+        sign = np.zeros_like(cells)
+        # Move the sources onto their neighbours in write order, so later writers overwrite the sign
+        for target, origin in _SHIFTS:
+            shifted = source[origin]
+            received[target] += shifted != 0
+            sign[target] = np.where(shifted != 0, shifted, sign[target])
+
+        base = np.where(over, 0, np.abs(cells))
+        current[index] = np.where(received > 0, (base + received) * sign, np.where(over, 0, cells))
+
+    return current.astype(boards.dtype), waves
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("overflow_batch needs numpy: pip install numpy")
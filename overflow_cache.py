@@ -0,0 +1,115 @@
+from array import array
+from collections import OrderedDict
+from a1_partc import Queue
+from a1_partd import overflow
+
+
+class OverflowCache:
+    """
+    Bounded least-recently-used cache of resolved overflows.
+
+    A position is keyed on its width and its cells packed one signed byte per cell,
+    row by row, the same packing CompactBoard.to_bytes uses, so list-of-lists grids
+    and compact boards can share a cache. Each entry holds the packed board after the
+    overflow and the number of waves it took. Both are immutable, so changing a grid
+    after it was resolved or stored can't change what the cache returns.
+
+    When the cache is full, the position that was used least recently is evicted.
+    """
+
+    def __init__(self, max_entries=4096):
+        """
+        Args:
+        max_entries (int): Maximum number of positions kept (default is 4096).
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (packed board after overflow, waves), least recently used first
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, key):
+        """
+        Looks up a position and marks it as the most recently used.
+
+        Args:
+        key (Tuple[int, bytes]): The width and packed cells of the position before overflow.
+
+        Returns:
+        Tuple[bytes, int] or None: The packed board after overflow and the number of
+                                   waves, or None if the position is not stored.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def store(self, key, result, waves):
+        """
+        Stores the result of resolving a position, evicting the least recently used one if full.
+
+        Args:
+        key (Tuple[int, bytes]): The width and packed cells of the position before overflow.
+        result (bytes): The packed cells after overflow.
+        waves (int): The number of waves of overflow.
+        """
+        entries = self._entries
+        if key in entries:
+            entries.move_to_end(key)
+        elif len(entries) >= self.max_entries:
+            entries.popitem(last=False)
+            self.evictions += 1
+        entries[key] = (bytes(result), waves)
+
+    def resolve(self, grid):
+        """
+        Resolves overflow on a grid in place, like a1_partd.overflow without the queue of
+        intermediate grids, looking the result up first.
+
+        Args:
+        grid (List[List[int]]): The grid to resolve.
+
+        Returns:
+        int: The number of waves of overflow.
+        """
+        cols = len(grid[0])
+        key = (cols, array('b', [value for row in grid for value in row]).tobytes())
+        entry = self.lookup(key)
+        if entry is None:
+            waves = overflow(grid, Queue(), deltas=True)
+            self.store(key, array('b', [value for row in grid for value in row]).tobytes(), waves)
+            return waves
+        result, waves = entry
+        cells = memoryview(result).cast('b')
+        for row_i, row in enumerate(grid):
+            row[:] = cells[row_i * cols:(row_i + 1) * cols].tolist()
+        return waves
+
+    def hit_rate(self):
+        """
+        Returns:
+        float: Fraction of lookups that found their position, 0.0 before any lookup.
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def clear(self):
+        """
+        Removes every entry and resets the counters.
+        """
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        """
+        Returns:
+        int: Number of positions currently stored.
+        """
+        return len(self._entries)
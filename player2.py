@@ -1,14 +1,6 @@
-from a2_partb import GameTree
+from tree_player import TreePlayer
 
-class PlayerTwo:
+class PlayerTwo(TreePlayer):
 
-    def __init__(self, name = "P2 Bot"):
-        self.name = name
-
-    def get_name(self):
-        return self.name
-
-    def get_play(self, board):
-        tree = GameTree(board, -1)
-        (row,col) = tree.get_move()
-        return (row,col)
\ No newline at end of file
+    def __init__(self, name = "P2 Bot", **options):
+        super().__init__(-1, name, **options)
@@ -0,0 +1,98 @@
+#
+#   These are the unit tests for the overflow simulation of assignment 1 part D
+#   To use this, run: python test_a1_partd.py
+
+import unittest
+from a1_partc import Queue
+from a1_partd import overflow, get_overflow_list, apply_delta, shape_tables
+
+class A1DTestCase(unittest.TestCase):
+    """These are the test cases for the overflow function"""
+
+    def test_overflow_waves(self):
+        grid = [[2, 0, 0],
+                [0, 0, 0],
+                [0, 0, -1]]
+        queue = Queue()
+        self.assertEqual(overflow(grid, queue), 1)
+        self.assertEqual(grid, [[0, 1, 0],
+                                [1, 0, 0],
+                                [0, 0, -1]])
+        self.assertEqual(queue.dequeue(), grid)
+        self.assertTrue(queue.is_empty())
+
+        # a chain reaction enqueues every intermediate grid, and stops once only one sign is left
+        grid = [[2, 2, 0],
+                [0, 0, 0],
+                [0, 0, -1]]
+        queue = Queue()
+        self.assertEqual(overflow(grid, queue, 3), 5)
+        self.assertEqual(queue.dequeue(), [[0, 3, 0],
+                                           [1, 0, 0],
+                                           [0, 0, -1]])
+        self.assertEqual(queue.dequeue(), [[1, 0, 1],
+                                           [1, 1, 0],
+                                           [0, 0, -1]])
+        self.assertTrue(queue.is_empty())
+        self.assertIsNone(get_overflow_list(grid))
+
+        # nothing happens when nothing overflows, or when all pieces belong to one player
+        for grid in ([[1, 0], [0, -1]], [[2, 0], [0, 1]]):
+            before = [row.copy() for row in grid]
+            queue = Queue()
+            self.assertEqual(overflow(grid, queue), 0)
+            self.assertEqual(grid, before)
+            self.assertTrue(queue.is_empty())
+
+    def test_long_cascade(self):
+        # a cascade running the length of a long strip needs more waves than the recursion limit allows
+        cols = 1200
+        grid = [[1] + [2] * (cols - 2) + [1], [1] + [2] * (cols - 2) + [-1]]
+        grid[0][0] += 1
+        queue = Queue()
+        waves = overflow(grid, queue)
+        self.assertGreater(waves, 1000)
+        self.assertEqual(len(queue), waves)
+        self.assertTrue(all(value >= 0 for row in grid for value in row))
+
+    def test_overflow_deltas(self):
+        grid = [[1, 2, 2, 2, 2, 2, 2, 1],
+                [1, 2, 2, 2, 2, 2, 2, -1]]
+        grid[0][0] += 1
+        full = [row.copy() for row in grid]
+        full_queue = Queue()
+        waves = overflow(full, full_queue)
+        self.assertGreater(waves, 2)
+
+        # replaying the deltas from the starting grid goes through exactly the same grids
+        replay = [row.copy() for row in grid]
+        delta_queue = Queue()
+        self.assertEqual(overflow(grid, delta_queue, deltas=True), waves)
+        self.assertEqual(grid, full)
+        while not full_queue.is_empty():
+            delta = delta_queue.dequeue()
+            self.assertTrue(all(replay[row][col] != value for row, col, value in delta))
+            apply_delta(replay, delta)
+            self.assertEqual(replay, full_queue.dequeue())
+        self.assertTrue(delta_queue.is_empty())
+
+    def test_shape_tables(self):
+        capacity, neighbors = shape_tables(3, 4)
+        self.assertEqual(capacity, (1, 2, 2, 1,
+                                    2, 3, 3, 2,
+                                    1, 2, 2, 1))
+        self.assertEqual(neighbors[0], (4, 1))
+        self.assertEqual(neighbors[5], (1, 9, 4, 6))
+        self.assertEqual(neighbors[11], (7, 10))
+        # tables are built once per shape and shared
+        self.assertIs(shape_tables(3, 4), shape_tables(3, 4))
+
+        # get_overflow_list uses the same thresholds
+        grid = [[2, 2, 3, 1],
+                [3, 4, 3, 3],
+                [1, -2, 3, -2]]
+        self.assertEqual(get_overflow_list(grid), [(0, 0), (0, 2), (1, 0), (1, 1), (1, 3), (2, 2), (2, 3)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+#
+#   These are the unit tests for the compact board used by the game tree search
+#   To use this, run: python test_compact_board.py
+
+import unittest
+from a1_partc import Queue
+from a1_partd import overflow
+from compact_board import CompactBoard
+from grid_fixtures import random_grids
+
+class CompactBoardTestCase(unittest.TestCase):
+    """These are the test cases for the CompactBoard class"""
+
+    def test_conversions(self):
+        grid = [[1, 0, -2],
+                [0, 3, 0],
+                [-1, 0, 4]]
+        board = CompactBoard.from_grid(grid)
+        self.assertEqual(board.to_grid(), grid)
+        self.assertEqual(board.get(2, 2), 4)
+        self.assertEqual(board.cells[board.index(1, 1)], 3)
+        self.assertEqual(CompactBoard.from_bytes(board.to_bytes(), 3), board)
+
+        # the board holds its own copy of the values
+        grid[0][0] = 2
+        self.assertEqual(board.get(0, 0), 1)
+        copy = board.copy()
+        copy.make_move(0, 1)
+        self.assertEqual(board.get(0, 0), 1)
+
+    def test_make_unmake(self):
+        board = CompactBoard.from_grid([[0, 1], [-1, 0]])
+        first = board.make_move(0, 1)
+        second = board.make_move(0, 1)
+        self.assertEqual(board.to_grid(), [[2, 1], [-1, 0]])
+        board.unmake_move(second)
+        self.assertEqual(board.to_grid(), [[1, 1], [-1, 0]])
+        board.unmake_move(first)
+        self.assertEqual(board.to_grid(), [[0, 1], [-1, 0]])
+        self.assertEqual(board.history, [])
+
+    def test_overflow_matches_a1_partd(self):
+        for grid in random_grids(300):
+            expected = [row.copy() for row in grid]
+            expected_waves = overflow(expected, Queue())
+
+            board = CompactBoard.from_grid(grid)
+            marker = len(board.history)
+            self.assertEqual(board.overflow(), expected_waves)
+            self.assertEqual(board.to_grid(), expected)
+
+            # taking the overflow back restores the original board
+            board.unmake_move(marker)
+            self.assertEqual(board.to_grid(), grid)
+
+    def test_running_totals(self):
+        def check(board):
+            cells = list(board.cells)
+            for value in range(-5, 6):
+                self.assertEqual(board.count(value), cells.count(value))
+            for sign in (1, -1):
+                owned = [i for i, value in enumerate(cells) if value * sign > 0]
+                self.assertEqual(board.cell_count[sign], len(owned))
+                self.assertEqual(board.material[sign], sum(abs(cells[i]) for i in owned))
+                self.assertEqual(board.threats[sign], sum(1 for i in owned if abs(cells[i]) == board.capacity[i]))
+
+        # the totals stay exact through moves, overflows and undos
+        for grid in random_grids(100, seed=1):
+            board = CompactBoard.from_grid(grid)
+            check(board)
+            marker = board.make_move(0, 1 if board.cells[0] >= 0 else -1)
+            board.overflow()
+            check(board)
+            board.unmake_move(marker)
+            check(board)
+
+
+if __name__ == '__main__':
+    unittest.main()
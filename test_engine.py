@@ -0,0 +1,70 @@
+#
+#   These are the unit tests for the headless game engine
+#   To use this, run: python test_engine.py
+
+import random
+import unittest
+from a1_partc import Queue
+from engine import Board, RandomPlayer, play_game, self_play, make_bot
+
+class EngineTestCase(unittest.TestCase):
+    """These are the test cases for the headless Board and the self-play runner"""
+
+    def test_board(self):
+        board = Board(6, 5)
+        self.assertEqual(board.get_board()[0][0], 1)
+        self.assertEqual(board.get_board()[4][5], -1)
+        self.assertTrue(board.valid_move(0, 0, 1))
+        self.assertFalse(board.valid_move(0, 0, -1))
+        self.assertFalse(board.valid_move(5, 0, 1))
+        self.assertEqual(board.check_win(), 0)
+
+        # the corner overflows into both of its neighbours, and the waves can be replayed one at a time
+        self.assertTrue(board.add_piece(0, 0, 1))
+        steps = Queue()
+        self.assertEqual(board.do_overflow(steps), 1)
+        self.assertEqual(board.get_board()[0][0], 2)
+        board.apply_delta(steps.dequeue())
+        self.assertEqual(board.get_board()[0][:2], [0, 1])
+        self.assertEqual(board.get_board()[1][0], 1)
+
+        board.set([[1] * 6 for _ in range(5)])
+        self.assertEqual(board.check_win(), 1)
+
+    def test_play_game(self):
+        rng = random.Random(0)
+        for _ in range(50):
+            bots = [RandomPlayer(1, seed=rng.random()), RandomPlayer(-1, seed=rng.random())]
+            winner, moves, thinking, bot_moves = play_game(bots, rng=rng)
+            self.assertEqual(bot_moves, moves)
+            self.assertIn(winner, (1, -1))
+            self.assertGreater(moves, 0)
+            # the winner made the last move
+            self.assertEqual(winner, 1 if moves % 2 == 1 else -1)
+
+        # a bot returning an invalid move, or failing, loses
+        class Cheater:
+            def get_play(self, board):
+                return (4, 5)
+        class Broken:
+            def get_play(self, board):
+                raise RuntimeError()
+        self.assertEqual(play_game([Cheater(), RandomPlayer(-1)])[:2], (-1, 0))
+        self.assertEqual(play_game([RandomPlayer(1, seed=1), Broken()])[:2], (1, 1))
+        # a game over the move limit is a draw
+        self.assertEqual(play_game([RandomPlayer(1, seed=2), RandomPlayer(-1, seed=3)], max_moves=4)[:2], (0, 4))
+        # the random opening moves are not the bots'
+        self.assertEqual(play_game([RandomPlayer(1, seed=2), RandomPlayer(-1, seed=3)], max_moves=4, opening=3)[3], 1)
+
+    def test_self_play(self):
+        results = self_play(['random', 'alphabeta'], 4, opening=2)
+        self.assertEqual(sum(results['wins']) + results['draws'], 4)
+        self.assertGreater(results['wins'][1], results['wins'][0])
+        self.assertGreater(results['moves'], 0)
+        self.assertEqual(results['bot_moves'], results['moves'] - 4 * 2)
+        with self.assertRaises(ValueError):
+            make_bot('expectimax', 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,379 @@
+#
+#   These are the unit tests for the GameTree search beyond the assignment tester: alpha-beta,
+#   move ordering, incremental evaluation, iterative deepening, tree reuse, pondering, cancelling
+#   and the parallel root search, and the bots built on it
+#   To use this, run: python test_game_tree.py
+
+import threading
+import time
+import unittest
+from unittest import mock
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from a2_partb import evaluate_board, score_position, GameTree
+from compact_board import CompactBoard
+from player1 import PlayerOne
+from player2 import PlayerTwo
+from transposition import EXACT, TranspositionTable, unpack_entry
+from a1_partc import Queue
+from a1_partd import overflow
+
+def wait_until(condition, timeout=30):
+    # Wait for another thread to make condition() true. The timeout is generous, as a busy machine can be slow
+    deadline = time.perf_counter() + timeout
+    while not condition() and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+class GameTreeTestCase(unittest.TestCase):
+    """These are the test cases for the GameTree search and the bots that use it"""
+
+    def test_alphabeta_matches_minimax(self):
+        boards = [[
+                    [ 0 , 2,  -2, 0, 0,  0],
+                    [ 0,  0 , -3,  -1,  0,  0],
+                    [ 0,  0,  0,  0,  0, 0],
+                    [ 0,  0,  0,  0,  2, 0],
+                    [ 0,  0,  0,  2,  0, 0]
+                     ],
+                    [
+                    [ 1 , 0,  2,  0, 0,  0],
+                    [ 0,  2 , 0,  0,  0,  0],
+                    [ 2,  0,  3,  0,  0, 0],
+                    [ 0,  0,  0,  -3,  0, 0],
+                    [ 0,  0,  0,  0, -2, -1]
+                    ]
+        ]
+
+        # alpha-beta must pick exactly the move plain minimax picks, while visiting fewer nodes
+        for board in boards:
+            for player in (1, -1):
+                plain = GameTree(board, player)
+                pruned = GameTree(board, player, search='alphabeta')
+                self.assertEqual(pruned.get_move(), plain.get_move())
+                self.assertEqual(plain.nodes_pruned, 0)
+                self.assertGreater(pruned.nodes_pruned, 0)
+                self.assertLess(pruned.nodes_visited, plain.nodes_visited)
+
+        with self.assertRaises(ValueError):
+            GameTree(boards[0], 1, search='expectimax')
+
+    def test_move_ordering(self):
+        boards = [[
+                    [ 0 , 2,  -2, 0, 0,  0],
+                    [ 0,  0 , -3,  -1,  0,  0],
+                    [ 0,  0,  0,  0,  0, 0],
+                    [ 0,  0,  0,  0,  2, 0],
+                    [ 0,  0,  0,  2,  0, 0]
+                     ],
+                    [
+                    [ 1 , 0,  2,  0, 0,  0],
+                    [ 0,  2 , 0,  0,  0,  0],
+                    [ 2,  0,  3,  0,  0, 0],
+                    [ 0,  0,  0,  -3,  0, 0],
+                    [ 0,  0,  0,  0, -2, -1]
+                    ]
+        ]
+
+        # ordering changes how much is searched, not the move: ties still go to the first move in row-major order
+        for board in boards:
+            for player in (1, -1):
+                plain = GameTree(board, player, search='alphabeta')
+                ordered = GameTree(board, player, search='alphabeta', ordering=True)
+                self.assertEqual(ordered.get_move(), plain.get_move())
+                self.assertLess(ordered.nodes_visited, plain.nodes_visited)
+                self.assertGreater(ordered.first_move_cutoffs / ordered.cutoffs,
+                                   plain.first_move_cutoffs / plain.cutoffs)
+
+                table = TranspositionTable(100000)
+                deepened = GameTree(board, player, search='alphabeta', ordering=True, transposition_table=table,
+                                    time_limit=60, max_depth=3)
+                self.assertEqual(deepened.get_move(), plain.get_move())
+                # the table keeps the best move of the positions it stores for the next, deeper iteration
+                self.assertTrue(any(unpack_entry(packed)[3] is not None for key, packed in table._table.items()))
+
+        # quiet moves that cause a cutoff are remembered as killers and in the history table
+        opening = [[0] * 6 for _ in range(5)]
+        opening[0][0] = 1
+        opening[4][5] = -1
+        tree = GameTree(opening, 1, search='alphabeta', ordering=True)
+        self.assertEqual(tree.get_move(), GameTree(opening, 1).get_move())
+        self.assertTrue(tree.killers)
+        self.assertGreater(sum(tree.history[1]) + sum(tree.history[-1]), 0)
+        # advancing a turn halves the history once; the step to the position a bot ponders in doesn't
+        history = {player: list(values) for player, values in tree.history.items()}
+        after = [row[:] for row in opening]
+        after[2][2] = 1
+        tree.advance(after, age_history=False)
+        self.assertEqual(tree.history, history)
+        after[3][3] = -1
+        tree.advance(after)
+        self.assertEqual(tree.history, {player: [value // 2 for value in values] for player, values in history.items()})
+
+        # moves that overflow come first, those capturing the most opponent neighbours before the others
+        board = [[1, 0, 0],
+                 [2, -1, 0],
+                 [0, 0, -1]]
+        tree = GameTree(board, 1, ordering=True)
+        self.assertEqual(list(tree.ordered_moves(tree.root)), [3, 0, 1, 2, 5, 6, 7])
+        # the transposition table's move goes before all of them
+        self.assertEqual(list(tree.ordered_moves(tree.root, tt_move=6)), [6, 3, 0, 1, 2, 5, 7])
+
+    def test_incremental_evaluation(self):
+        board = [
+                    [ 1 , 0,  2,  0, 0,  0],
+                    [ 0,  2 , 0,  0,  0,  0],
+                    [ 2,  0,  3,  0,  0, 0],
+                    [ 0,  0,  0,  -3,  0, 0],
+                    [ 0,  0,  0,  0, -2, -1]
+                ]
+
+        # the running score matches a full evaluation and children know the move that made them
+        for player in (1, -1):
+            tree = GameTree(board, player)
+            self.assertEqual(tree.evaluate(tree.root), evaluate_board(board, player))
+            for child in tree.root.generate_children():
+                row, col = child.move
+                self.assertGreaterEqual(board[row][col] * player, 0)
+                self.assertEqual(tree.evaluate(child), evaluate_board(child.board, player))
+            self.assertEqual(tree.root.board, board)
+
+    def test_children_follow_game_rules(self):
+        board = [
+                    [ 1 , 0,  2,  0, 0,  0],
+                    [ 0,  2 , 0,  0,  0,  0],
+                    [ 2,  0,  3,  0,  0, 0],
+                    [ 0,  0,  0,  -3,  0, 0],
+                    [ 0,  0,  0,  0, -2, -1]
+                ]
+
+        # every empty or own cell is a move, and each child is the board after the move's overflow
+        for player in (1, -1):
+            tree = GameTree(board, player)
+            expected = []
+            for row in range(5):
+                for col in range(6):
+                    if board[row][col] == 0 or board[row][col] * player > 0:
+                        grid = [line.copy() for line in board]
+                        grid[row][col] += player
+                        overflow(grid, Queue())
+                        expected.append(((row, col), grid))
+            self.assertEqual([(child.move, child.board) for child in tree.root.generate_children()], expected)
+
+        # once a player has lost all their pieces the game is over and there are no more moves
+        tree = GameTree([[1, 1], [1, 0]], -1)
+        child = GameTree.Node(tree.state, 1, -1)
+        self.assertEqual(list(child.generate_children()), [])
+
+    def test_iterative_deepening(self):
+        board = [
+                    [ 1 , 0,  0,  0, 0,  0],
+                    [ 0,  0 , 0,  0,  0,  0],
+                    [ 0,  0,  0,  0,  0, 0],
+                    [ 0,  0,  0,  0,  0, 0],
+                    [ 0,  0,  0,  0, 0, -1]
+                ]
+
+        # deepening up to the default depth gives the same move as the fixed depth search
+        tree = GameTree(board, 1, search='alphabeta', time_limit=60, max_depth=3)
+        self.assertEqual(tree.get_move(), GameTree(board, 1, search='alphabeta').get_move())
+        self.assertEqual(tree.completed_depth, 3)
+
+        # without any time the depth 1 search still finishes and provides the move
+        tree = GameTree(board, -1, search='alphabeta', time_limit=0)
+        self.assertEqual(tree.get_move(), GameTree(board, -1, tree_height=2).get_move())
+        self.assertEqual(tree.completed_depth, 1)
+
+        # the deadline stops the deepening, which would otherwise go on for far longer than this
+        start = time.perf_counter()
+        tree = GameTree(board, 1, time_limit=0.2)
+        self.assertIsNotNone(tree.get_move())
+        self.assertLess(time.perf_counter() - start, 30)
+        self.assertGreaterEqual(tree.completed_depth, 1)
+
+    def test_tree_reuse_and_ponder(self):
+        board = [
+                    [ 1 , 0,  2,  0, 0,  0],
+                    [ 0,  2 , 0,  0,  0,  0],
+                    [ 2,  0,  3,  0,  0, 0],
+                    [ 0,  0,  0,  -3,  0, 0],
+                    [ 0,  0,  0,  0, -2, -1]
+                ]
+
+        def play(grid, move, player):
+            state = CompactBoard.from_grid(grid)
+            state.make_move(state.index(*move), player)
+            state.overflow()
+            return state.to_grid()
+
+        table = TranspositionTable(100000)
+        tree = GameTree(board, 1, search='alphabeta', transposition_table=table, ordering=True)
+        move = tree.get_move()
+        after = play(board, move, 1)
+        replies = [(row, col) for row in range(5) for col in range(6) if after[row][col] <= 0]
+        # a reply the last search looked at was already searched one ply deep, and advancing to it
+        # picks the same move as a new tree
+        reached = [reply for reply in replies if tree.advance(play(after, reply, -1)) > 0]
+        self.assertTrue(reached)
+        position = play(after, reached[0], -1)
+        self.assertEqual(tree.advance(position), 1)
+        self.assertEqual(tree.get_move(), GameTree(position, 1, search='alphabeta').get_move())
+
+        # pondering searches the position after our move, and leaves the board as it was
+        tree = GameTree(board, 1, search='alphabeta', transposition_table=TranspositionTable(100000), ordering=True)
+        move = tree.get_move()
+        after = play(board, move, 1)
+        tree.advance(after)
+        self.assertEqual(tree.ponder(max_depth=3), 3)
+        self.assertEqual(tree.state.to_grid(), after)
+        self.assertEqual(tree.state.history, [])
+        # every reply was searched by the ponder, to the depth a fixed depth search needs below it
+        for reply in replies:
+            self.assertGreaterEqual(tree.advance(play(after, reply, -1)), 1)
+        # on another thread it goes on until it is cancelled, and takes its moves back
+        tree.advance(after)
+        thread = threading.Thread(target=tree.ponder)
+        thread.start()
+        tree.cancel()
+        thread.join(30)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(tree.state.to_grid(), after)
+        self.assertEqual(tree.state.history, [])
+
+        # a minimax tree ponders with minimax too, so every score it stores is exact
+        table = TranspositionTable(100000)
+        tree = GameTree(after, 1, search='minimax', transposition_table=table)
+        self.assertEqual(tree.ponder(max_depth=2), 2)
+        self.assertGreater(len(table), 0)
+        self.assertEqual({unpack_entry(packed)[2] for key, packed in table._table.items()}, {EXACT})
+
+        # a pondering bot searches while the opponent moves, and stops its thread as soon as it is asked to play
+        pondered = threading.Event()
+        ponder = GameTree.ponder
+
+        def ponder_then_signal(tree, max_depth=None):
+            # Let the test know once two plies are searched, then go on as the bot would until cancelled
+            ponder(tree, 2)
+            pondered.set()
+            return ponder(tree, max_depth)
+
+        with mock.patch.object(GameTree, 'ponder', ponder_then_signal):
+            bot = PlayerOne(ponder=True)
+            move = bot.get_play(board)
+            self.assertEqual(move, GameTree(board, 1).get_move())
+            self.assertTrue(bot.ponder_thread.is_alive())
+            position = play(play(board, move, 1), (4, 4), -1)
+            self.assertTrue(pondered.wait(30))  # The opponent thinking
+            row, col = bot.get_play(position)
+        self.assertGreaterEqual(position[row][col], 0)
+        self.assertGreater(bot.reused_depth, 0)
+        bot.close()
+        self.assertIsNone(bot.ponder_thread)
+        # the same bot plays player -1, pondering on the position its own move leads to
+        bot = PlayerTwo(ponder=True)
+        move = bot.get_play(board)
+        self.assertEqual(move, GameTree(board, -1).get_move())
+        bot.stop_pondering()
+        self.assertEqual(bot.tree.state.to_grid(), play(board, move, -1))
+        bot.close()
+
+        # a bot searching on another thread can be told to stop, and still returns a move
+        bot = PlayerOne(time_limit=60)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(bot.get_play, board)
+            self.assertTrue(wait_until(lambda: bot.tree is not None and bot.tree.completed_depth >= 1))
+            bot.cancel()
+            row, col = future.result(timeout=30)  # Far less than the 60 s the search would take
+        self.assertGreaterEqual(board[row][col], 0)
+        self.assertGreaterEqual(bot.tree.completed_depth, 1)
+
+        # a cancel() that comes while the ponder thread is being stopped is not lost
+        bot = PlayerOne(ponder=True)
+        bot.get_play(board)
+        bot.ponder = False  # Don't ponder after the next move, which would overwrite its completed_depth
+        stop_pondering = bot.stop_pondering
+
+        def cancel_then_stop():
+            bot.cancel()
+            stop_pondering()
+
+        bot.stop_pondering = cancel_then_stop
+        row, col = bot.get_play(after)
+        self.assertGreaterEqual(after[row][col], 0)
+        self.assertEqual(bot.tree.completed_depth, 1)
+
+        # cancelled before the search starts, get_move still finishes the one-ply search and plays its move
+        expected = GameTree(board, 1, 2).get_move()
+        for tree in (GameTree(board, 1, time_limit=60), GameTree(board, 1, 4)):
+            tree.cancel()
+            self.assertEqual(tree.get_move(), expected)
+            self.assertEqual(tree.completed_depth, 1)
+
+    def test_parallel_root_search(self):
+        boards = [[
+                    [ 0 , 2,  -2, 0, 0,  0],
+                    [ 0,  0 , -3,  -1,  0,  0],
+                    [ 0,  0,  0,  0,  0, 0],
+                    [ 0,  0,  0,  0,  2, 0],
+                    [ 0,  0,  0,  2,  0, 0]
+                     ],
+                    [
+                    [ 1 , 0,  2,  0, 0,  0],
+                    [ 0,  2 , 0,  0,  0,  0],
+                    [ 2,  0,  3,  0,  0, 0],
+                    [ 0,  0,  0,  -3,  0, 0],
+                    [ 0,  0,  0,  0, -2, -1]
+                    ]
+        ]
+
+        # splitting the root moves over worker processes must not change the chosen move
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            for board in boards:
+                for player in (1, -1):
+                    for search in ('minimax', 'alphabeta'):
+                        expected = GameTree(board, player, search=search).get_move()
+                        tree = GameTree(board, player, search=search, executor=executor)
+                        self.assertEqual(tree.get_move(), expected)
+                        self.assertGreater(tree.nodes_visited, 0)
+
+            tree = GameTree(boards[1], 1, search='alphabeta', executor=executor, time_limit=60, max_depth=3)
+            self.assertEqual(tree.get_move(), GameTree(boards[1], 1, search='alphabeta').get_move())
+            self.assertEqual(tree.completed_depth, 3)
+
+            # a time limited parallel search still returns a move
+            opening = [[0] * 6 for _ in range(5)]
+            opening[0][0] = 1
+            opening[4][5] = -1
+            tree = GameTree(opening, 1, search='alphabeta', executor=executor, time_limit=0.5)
+            self.assertIsNotNone(tree.get_move())
+            self.assertGreaterEqual(tree.completed_depth, 1)
+
+            # cancel() stops a parallel search too, once the one-ply search is done
+            tree = GameTree(opening, 1, search='alphabeta', executor=executor, time_limit=60)
+            tree.cancel()
+            self.assertEqual(tree.get_move(), GameTree(opening, 1, 2, search='alphabeta').get_move())
+            self.assertEqual(tree.completed_depth, 1)
+
+        # a move still queued when the deadline has passed gives up at once instead of getting a fresh budget
+        state = CompactBoard.from_grid(boards[1])
+        self.assertIsNone(score_position(state.to_bytes(), state.cols, 1, 3, 'alphabeta', time.time() - 1))
+        self.assertIsNotNone(score_position(state.to_bytes(), state.cols, 1, 3, 'alphabeta', time.time() + 60))
+
+        # a cancelled fixed depth search falls back on the one-ply search without queueing it behind the
+        # workers still busy with the abandoned search
+        class CountingExecutor(ThreadPoolExecutor):
+            submitted = 0
+
+            def submit(self, *args, **kwargs):
+                self.submitted += 1
+                return super().submit(*args, **kwargs)
+
+        with CountingExecutor(max_workers=2) as executor:
+            tree = GameTree(boards[1], 1, search='alphabeta', executor=executor)
+            tree.cancel()
+            self.assertEqual(tree.get_move(), GameTree(boards[1], 1, 2, search='alphabeta').get_move())
+            self.assertEqual(tree.completed_depth, 1)
+            self.assertEqual(executor.submitted, sum(1 for row in boards[1] for cell in row if cell >= 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,235 @@
+#
+#   These are the unit tests for the hash table variants of a2_parta: tombstones, incremental
+#   rehashing, the array-backed tables, bulk operations, the memory-mapped table and the sharded table
+#   To use this, run: python test_hash_tables.py
+
+import os
+import random
+import tempfile
+import threading
+import unittest
+from a2_parta import HashTable, CompactHashTable, IntHashTable, RobinHoodHashTable, MappedHashTable, ShardedHashTable, DELETED
+
+class HashTablesTestCase(unittest.TestCase):
+    """These are the test cases for the HashTable extensions and the other a2_parta tables"""
+
+    def test_HashTable_tombstones(self):
+        # keys that probe into each other, removed and inserted in random order, behave like a dict
+        rng = random.Random(0)
+        table = HashTable(8)
+        expected = {}
+        for step in range(5000):
+            key = rng.randrange(64) * 8  # every key hashes to the same starting slot of a small table
+            if rng.random() < 0.5:
+                self.assertEqual(table.insert(key, step), key not in expected)
+                expected.setdefault(key, step)
+            else:
+                self.assertEqual(table.remove(key), expected.pop(key, None) is not None)
+            self.assertEqual(len(table), len(expected))
+        for key in range(0, 512, 8):
+            self.assertEqual(table.search(key), expected.get(key))
+        # removed records don't make the table grow without bound
+        self.assertLessEqual(table.capacity(), 256)
+
+    def test_HashTable_incremental(self):
+        # an incremental rehash moves records over a few slots per operation, and every record
+        # can be found, modified and removed while it is in progress
+        rng = random.Random(1)
+        table = HashTable(8, incremental=True)
+        expected = {}
+        rehashing = 0
+        for step in range(20000):
+            key = rng.randrange(3000)
+            action = rng.random()
+            if action < 0.5:
+                self.assertEqual(table.insert(key, step), key not in expected)
+                expected.setdefault(key, step)
+            elif action < 0.7:
+                self.assertEqual(table.remove(key), expected.pop(key, None) is not None)
+            elif action < 0.8:
+                self.assertEqual(table.modify(key, -step), key in expected)
+                if key in expected:
+                    expected[key] = -step
+            else:
+                self.assertEqual(table.search(key), expected.get(key))
+            rehashing += table.old_list is not None
+            self.assertEqual(len(table), len(expected))
+            self.assertEqual(table.tombstones, sum(1 for slot in table.my_list if slot is DELETED))
+        self.assertGreater(rehashing, 0)
+        self.assertEqual(table.capacity() in (4096, 8192), True)
+        for key in range(3000):
+            self.assertEqual(table.search(key), expected.get(key))
+
+    def test_compact_tables(self):
+        # the array-backed tables resize at the same points as HashTable and behave like a dict
+        keys = ["apple", "banana", "strawberry", "mango", "orange", "lichee", "peach", "pear",
+                "grape", "nectarine", "blackberry", "clementine", "apricot"]
+        table = CompactHashTable(8)
+        reference = HashTable(8)
+        for i, key in enumerate(keys):
+            self.assertEqual(table.insert(key, i), True)
+            reference.insert(key, i)
+            self.assertEqual(table.capacity(), reference.capacity())
+            self.assertEqual(len(table), i + 1)
+        self.assertEqual(table.insert("apple", 5), False)
+        self.assertEqual(table.search("apple"), 0)
+
+        for table_type, key_bits in ((CompactHashTable, 70), (IntHashTable, 64), (RobinHoodHashTable, 70)):
+            rng = random.Random(2)
+            table = table_type(8)
+            pool = [rng.getrandbits(key_bits) for _ in range(2000)]
+            expected = {}
+            for step in range(20000):
+                key = rng.choice(pool)
+                action = rng.random()
+                if action < 0.5:
+                    self.assertEqual(table.insert(key, -step), key not in expected)
+                    expected.setdefault(key, -step)
+                elif action < 0.7:
+                    self.assertEqual(table.remove(key), expected.pop(key, None) is not None)
+                elif action < 0.8:
+                    self.assertEqual(table.modify(key, step), key in expected)
+                    if key in expected:
+                        expected[key] = step
+                else:
+                    self.assertEqual(table.search(key), expected.get(key))
+                self.assertEqual(len(table), len(expected))
+            for key in pool:
+                self.assertEqual(table.search(key), expected.get(key))
+
+        # Robin Hood hashing grows at the same points, and evens out probe lengths
+        rng = random.Random(3)
+        keys = [rng.getrandbits(64) for _ in range(5000)]
+        linear = CompactHashTable()
+        robin_hood = RobinHoodHashTable()
+        self.assertEqual(robin_hood.probe_stats(), (0, 0.0))
+        for key in keys:
+            linear.insert(key, 0)
+            robin_hood.insert(key, 0)
+            self.assertEqual(robin_hood.capacity(), linear.capacity())
+        longest, mean = robin_hood.probe_stats()
+        self.assertLess(longest, linear.probe_stats()[0])
+        self.assertAlmostEqual(mean, linear.probe_stats()[1])  # Swaps move probe length around, they don't add any
+        reference = HashTable()
+        for key in keys[:100]:
+            reference.insert(key, 0)
+        self.assertGreaterEqual(reference.probe_stats()[1], 1.0)
+
+        table = IntHashTable()
+        with self.assertRaises(OverflowError):
+            table.insert(-1, 0)
+        self.assertEqual(len(table), 0)
+        self.assertEqual(table.search(-1), None)
+
+    def test_bulk_operations(self):
+        rng = random.Random(4)
+        items = [(rng.getrandbits(64), i) for i in range(1000)]
+        for table_type in (HashTable, CompactHashTable, IntHashTable, RobinHoodHashTable):
+            # from_items ends at the capacity inserting one by one would have reached
+            one_by_one = table_type()
+            for key, value in items:
+                one_by_one.insert(key, value)
+            table = table_type.from_items(iter(items))
+            self.assertEqual(table.capacity(), one_by_one.capacity())
+            self.assertEqual(len(table), 1000)
+            keys = [key for key, _ in items]
+            self.assertEqual(table.get_many(keys), list(range(1000)))
+            self.assertEqual(table.get_many([1 << 63, keys[5]], default=-1), [-1, 5])
+
+            # update replaces existing values, adds new ones and resizes at most once
+            more = [(keys[i], -i) for i in range(0, 1000, 2)] + [(rng.getrandbits(64), 7) for _ in range(2000)]
+            self.assertEqual(table.update(more), 2000)
+            self.assertEqual(len(table), 3000)
+            self.assertEqual(table.capacity(), table_type.from_items(more + items).capacity())
+            self.assertEqual(table.get_many(keys[:4]), [0, 1, -2, 3])
+
+        # a table big enough for every pair, counting pairs for existing keys too, is not reallocated,
+        # and a rehash in progress is finished first
+        table = HashTable(incremental=True)
+        for key in range(23):
+            table.insert(key, key)
+        self.assertIsNotNone(table.old_list)
+        self.assertEqual(table.update([(key, -key) for key in range(10, 30)]), 7)
+        self.assertIsNone(table.old_list)
+        slots = table.my_list
+        table.update([(key, 0) for key in range(10)])
+        self.assertIs(table.my_list, slots)
+        self.assertEqual(table.get_many(range(9, 12)), [0, -10, -11])
+
+    def test_mapped_table(self):
+        rng = random.Random(5)
+        items = [(rng.getrandbits(64), rng.randint(-2 ** 63, 2 ** 63 - 1)) for _ in range(3000)]
+        with tempfile.TemporaryDirectory() as directory:
+            for table_type in (HashTable, IntHashTable, RobinHoodHashTable):
+                path = os.path.join(directory, table_type.__name__)
+                table = table_type.from_items(items)
+                table.remove(items[0][0])
+                table.save(path, tag=42)
+                # the file can be opened by several readers at once, each seeing every record
+                with MappedHashTable(path) as first, MappedHashTable(path) as second:
+                    self.assertEqual(len(first), 2999)
+                    self.assertEqual(first.tag, 42)
+                    self.assertEqual(first.capacity(), HashTable.capacity_for(2999))
+                    self.assertEqual(first.search(items[0][0]), None)
+                    for key, value in items[1:]:
+                        self.assertEqual(first.search(key), value)
+                    self.assertEqual(sorted(second.items()), sorted(items[1:]))
+                    self.assertEqual(second.get_many([items[1][0], 1], default=0), [items[1][1], 0])
+
+            # duplicate keys and files of another format are refused
+            path = os.path.join(directory, 'table')
+            with self.assertRaises(ValueError):
+                MappedHashTable.write(path, [(1, 1), (1, 2)], 2)
+            with open(path, 'wb') as file:
+                file.write(b'not a table' * 10)
+            with self.assertRaises(ValueError):
+                MappedHashTable(path)
+
+    def test_sharded_table(self):
+        table = ShardedHashTable(shards=4, initial_capacity=8)
+        self.assertEqual(table.insert("apple", 1), True)
+        self.assertEqual(table.insert("apple", 2), False)
+        self.assertEqual(table.modify("apple", 3), True)
+        self.assertEqual(table.search("apple"), 3)
+        self.assertEqual(table.update([("apple", 4), ("pear", 5)]), 1)
+        self.assertEqual(sorted(table.items()), [("apple", 4), ("pear", 5)])
+        self.assertEqual(table.remove("apple"), True)
+        self.assertEqual(table.get_many(["apple", "pear"], default=0), [0, 5])
+        self.assertEqual(len(table), 1)
+
+        # writers growing and shrinking their own keys while readers search every key: a reader only ever
+        # sees a key's one value or nothing, and every writer's last state is kept
+        table = ShardedHashTable(shards=3, initial_capacity=8)
+        errors = []
+        stop = threading.Event()
+
+        def writer(first):
+            for _ in range(3):
+                for key in range(first, first + 2000):
+                    table.insert(key, key * 2)
+                for key in range(first, first + 2000, 2):
+                    table.remove(key)
+
+        def reader():
+            while not stop.is_set():
+                for key in range(0, 8000, 7):
+                    value = table.search(key)
+                    if value is not None and value != key * 2:
+                        errors.append((key, value))
+
+        writers = [threading.Thread(target=writer, args=(first,)) for first in range(0, 8000, 2000)]
+        readers = [threading.Thread(target=reader) for _ in range(2)]
+        for thread in readers + writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        stop.set()
+        for thread in readers:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(table), 4000)
+        self.assertEqual(sorted(table.items()), [(key, key * 2) for key in range(1, 8000, 2)])
+
+
+if __name__ == '__main__':
+    unittest.main()
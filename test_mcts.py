@@ -0,0 +1,122 @@
+#
+#   These are the unit tests for the Monte Carlo tree search player
+#   To use this, run: python test_mcts.py
+
+import random
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from a1_partd import overflow_flat, shape_tables
+from compact_board import CompactBoard
+from mcts import MCTSPlayer
+
+class MCTSTestCase(unittest.TestCase):
+    """These are the test cases for the MCTSPlayer class and the rollout overflow"""
+
+    def test_rollout_overflow(self):
+        # the flat overflow kernel the rollouts use resolves a move the same way CompactBoard.overflow does
+        rng = random.Random(0)
+        for _ in range(500):
+            rows = rng.randint(2, 6)
+            cols = rng.randint(2, 6)
+            capacity, neighbors = shape_tables(rows, cols)
+            cells = [rng.randint(-capacity[i], capacity[i]) for i in range(rows * cols)]
+            player = rng.choice([1, -1])
+            moves = [i for i in range(len(cells)) if cells[i] * player >= 0]
+            if not moves:
+                continue
+            move = rng.choice(moves)
+            cells[move] += player
+            board = CompactBoard(rows, cols, cells)
+            board.overflow()
+            counts = [0, sum(1 for value in cells if value > 0), sum(1 for value in cells if value < 0)]
+            if abs(cells[move]) > capacity[move]:
+                overflow_flat(cells, capacity, neighbors, [move], counts)
+            self.assertEqual(cells, board.cells.tolist())
+            self.assertEqual((counts[1], counts[-1]), (board.cell_count[1], board.cell_count[-1]))
+
+    def test_valid_move(self):
+        board = [[1, 0, 0, 0, 0, 0],
+                 [0, -2, 0, 0, 0, 0],
+                 [0, 0, 0, 0, 0, 0],
+                 [0, 0, 0, 0, 2, 0],
+                 [0, 0, 0, 0, 0, -1]]
+        for player in (1, -1):
+            bot = MCTSPlayer(player=player, playouts=200, seed=1)
+            row, col = bot.get_play(board)
+            self.assertGreaterEqual(board[row][col] * player, 0)
+            self.assertEqual(bot.playouts_done, 200)
+
+    def test_finds_win(self):
+        # (0, 1) overflows into (0, 0), taking the last piece of player -1
+        board = [[-1, 2, 0, 0],
+                 [0, 1, 0, 0],
+                 [0, 0, 1, 0]]
+        self.assertEqual(MCTSPlayer(playouts=300, seed=2).get_play(board), (0, 1))
+
+    def test_tree_reuse(self):
+        board = [[1, 0, 0],
+                 [0, 0, 0],
+                 [0, 0, -1]]
+        bot = MCTSPlayer(playouts=2000, seed=3)
+        row, col = bot.get_play(board)
+        self.assertEqual(bot.reused_visits, 0)
+        # answer with the reply the tree explored most, so it has statistics to keep
+        child = next(node for node in bot.root.children if node.move == row * 3 + col)
+        reply = max(child.children, key=lambda node: node.visits)
+        visits = reply.visits
+        state = CompactBoard.from_grid(board)
+        state.make_move(child.move, 1)
+        state.overflow()
+        state.make_move(reply.move, -1)
+        state.overflow()
+        bot.get_play(state.to_grid())
+        self.assertGreater(visits, 0)
+        self.assertEqual(bot.reused_visits, visits)
+        self.assertIs(bot.root, reply)
+        self.assertIsNone(bot.root.parent)
+        self.assertEqual(bot.root.visits, visits + 2000)
+
+    def test_time_limit(self):
+        board = [[0] * 6 for _ in range(5)]
+        board[0][0] = 1
+        board[4][5] = -1
+        # with no playout count, only the time limit stops the search
+        bot = MCTSPlayer(time_limit=0.2, seed=4)
+        start = time.perf_counter()
+        bot.get_play(board)
+        self.assertLess(time.perf_counter() - start, 30)
+        self.assertGreater(bot.playouts_done, 0)
+
+    def test_cancel(self):
+        board = [[0] * 6 for _ in range(5)]
+        board[0][0] = 1
+        board[4][5] = -1
+        bot = MCTSPlayer(time_limit=60, seed=5)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(bot.get_play, board)
+            # Cancel once the search is running; a cancel() before get_play starts is meant for the last move
+            deadline = time.perf_counter() + 30
+            while bot.playouts_done == 0 and time.perf_counter() < deadline:
+                time.sleep(0.01)
+            bot.cancel()
+            row, col = future.result(timeout=30)  # Far less than the 60 s the search would take
+        self.assertGreaterEqual(board[row][col], 0)
+        self.assertGreater(bot.playouts_done, 0)
+
+        # a cancel() that comes before the search starts is not lost: one playout is run and its move played
+        bot = MCTSPlayer(time_limit=60, seed=6)
+        reuse_tree = bot.reuse_tree
+
+        def cancel_then_reuse(position):
+            bot.cancel()
+            return reuse_tree(position)
+
+        bot.reuse_tree = cancel_then_reuse
+        row, col = bot.get_play(board)
+        self.assertGreaterEqual(board[row][col], 0)
+        self.assertEqual(bot.playouts_done, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+#
+#   These are the unit tests for the batched overflow simulator
+#   To use this, run: python test_overflow_batch.py (needs numpy)
+
+import unittest
+from a1_partc import Queue
+from a1_partd import overflow
+from grid_fixtures import random_grids
+from overflow_batch import np, overflow_batch, capacity_mask
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class OverflowBatchTestCase(unittest.TestCase):
+    """These are the test cases for overflow_batch"""
+
+    def test_capacity_mask(self):
+        self.assertEqual(capacity_mask(3, 4).tolist(), [[1, 2, 2, 1],
+                                                        [2, 3, 3, 2],
+                                                        [1, 2, 2, 1]])
+
+    def test_matches_scalar_overflow(self):
+        for rows, cols in ((5, 6), (3, 3), (1, 4), (6, 2)):
+            grids = random_grids(300, shape=(rows, cols))
+            boards = np.array(grids, dtype=np.int8)
+            before = boards.copy()
+            final, waves = overflow_batch(boards)
+            self.assertTrue((boards == before).all())
+            self.assertEqual(final.dtype, np.int8)
+            for i, grid in enumerate(grids):
+                expected = [row.copy() for row in grid]
+                self.assertEqual(waves[i], overflow(expected, Queue()))
+                self.assertEqual(final[i].tolist(), expected)
+
+        with self.assertRaises(ValueError):
+            overflow_batch(np.zeros((5, 6), dtype=np.int8))
+
+
+if __name__ == '__main__':
+    unittest.main()
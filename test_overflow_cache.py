@@ -0,0 +1,85 @@
+#
+#   These are the unit tests for the overflow result cache
+#   To use this, run: python test_overflow_cache.py
+
+import unittest
+from a1_partc import Queue
+from a1_partd import overflow
+from compact_board import CompactBoard
+from grid_fixtures import random_grids
+from overflow_cache import OverflowCache
+
+class OverflowCacheTestCase(unittest.TestCase):
+    """These are the test cases for the OverflowCache class"""
+
+    def test_resolve(self):
+        cache = OverflowCache()
+        for grid in random_grids(200, shape=(4, 5)):
+            expected = [row.copy() for row in grid]
+            waves = overflow(expected, Queue())
+            # a miss resolves the grid, a hit gives the same result
+            for _ in range(2):
+                resolved = [row.copy() for row in grid]
+                self.assertEqual(cache.resolve(resolved), waves)
+                self.assertEqual(resolved, expected)
+        self.assertEqual(cache.hits + cache.misses, 400)
+        self.assertGreaterEqual(cache.hit_rate(), 0.5)
+
+    def test_mutation_safety(self):
+        cache = OverflowCache()
+        grid = [[2, 0, 0],
+                [0, 0, 0],
+                [0, 0, -1]]
+        first = [row.copy() for row in grid]
+        self.assertEqual(cache.resolve(first), 1)
+        # changing the resolved grid, or the one a hit was written to, doesn't change the stored result
+        first[0][1] = 3
+        second = [row.copy() for row in grid]
+        self.assertEqual(cache.resolve(second), 1)
+        self.assertEqual(second, [[0, 1, 0],
+                                  [1, 0, 0],
+                                  [0, 0, -1]])
+        second[1][0] = -3
+        third = [row.copy() for row in grid]
+        cache.resolve(third)
+        self.assertEqual(third[1][0], 1)
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+    def test_lru_eviction(self):
+        cache = OverflowCache(max_entries=2)
+        cache.store((1, b'a'), b'A', 1)
+        cache.store((1, b'b'), b'B', 2)
+        self.assertEqual(cache.lookup((1, b'a')), (b'A', 1))
+        # b is now the least recently used, so it goes first
+        cache.store((1, b'c'), b'C', 3)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.evictions, 1)
+        self.assertIsNone(cache.lookup((1, b'b')))
+        self.assertEqual(cache.lookup((1, b'c')), (b'C', 3))
+        self.assertEqual(cache.hit_rate(), 2 / 3)
+
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.hit_rate(), 0.0)
+        with self.assertRaises(ValueError):
+            OverflowCache(0)
+
+    def test_compact_board(self):
+        cache = OverflowCache()
+        for grid in random_grids(200, seed=1, shape=(4, 5)):
+            expected = CompactBoard.from_grid(grid)
+            waves = expected.overflow()
+            for _ in range(2):
+                board = CompactBoard.from_grid(grid)
+                self.assertEqual(board.overflow(cache), waves)
+                self.assertEqual(board, expected)
+                self.assertEqual(board.material, expected.material)
+                # hits are logged like any other write, so they can be taken back
+                board.unmake_move(0)
+                self.assertEqual(board.to_grid(), grid)
+        self.assertGreater(cache.hits, 0)
+        self.assertEqual(cache.hits, len(cache))
+
+
+if __name__ == '__main__':
+    unittest.main()
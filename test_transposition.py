@@ -0,0 +1,84 @@
+#
+#   These are the unit tests for the Zobrist-hashed transposition table and its saved files
+#   To use this, run: python test_transposition.py
+
+import os
+import tempfile
+import unittest
+from a2_partb import GameTree
+from transposition import EXACT, LOWER, UPPER, TranspositionTable, pack_entry, unpack_entry
+
+class TranspositionTableTestCase(unittest.TestCase):
+    """These are the test cases for the TranspositionTable class and its entry packing"""
+
+    def test_transposition_table(self):
+        board = [
+                    [ 1 , 0,  2,  0, 0,  0],
+                    [ 0,  2 , 0,  0,  0,  0],
+                    [ 2,  0,  3,  0,  0, 0],
+                    [ 0,  0,  0,  -3,  0, 0],
+                    [ 0,  0,  0,  0, -2, -1]
+                ]
+
+        # the incrementally updated hash of every child must match hashing its board from scratch
+        table = TranspositionTable(100)
+        tree = GameTree(board, 1, transposition_table=table)
+        for child in tree.root.generate_children():
+            self.assertEqual(child.key, table.hasher.hash_board(child.board, -1))
+        self.assertNotEqual(table.hasher.hash_board(board, 1), table.hasher.hash_board(board, -1))
+
+        # transpositions are found and the chosen move does not change
+        for player in (1, -1):
+            expected = GameTree(board, player, search='alphabeta').get_move()
+            table = TranspositionTable(300)
+            tree = GameTree(board, player, search='alphabeta', transposition_table=table)
+            self.assertEqual(tree.get_move(), expected)
+            self.assertGreater(table.hits, 0)
+            self.assertGreater(table.misses, 0)
+            self.assertLessEqual(len(table), 300)
+
+        # a full table evicts its oldest entries instead of growing
+        table = TranspositionTable(50)
+        GameTree(board, 1, search='alphabeta', transposition_table=table).get_move()
+        self.assertEqual(len(table), 50)
+        self.assertGreater(table.evictions, 0)
+
+        # a saved table backs a new one: every saved position is found without searching it again
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'positions.tbl')
+            table = TranspositionTable(1000)
+            GameTree(board, 1, search='alphabeta', transposition_table=table).get_move()
+            table.save(path)
+            warm = TranspositionTable(1000, backing=path)
+            for key, packed in table._table.items():
+                self.assertEqual(warm.probe(key), unpack_entry(packed))
+            self.assertEqual(warm.hits, len(table))
+            tree = GameTree(board, 1, search='alphabeta', transposition_table=warm)
+            self.assertEqual(tree.get_move(), GameTree(board, 1, search='alphabeta').get_move())
+            warm.close()
+            with self.assertRaises(ValueError):
+                TranspositionTable(1000, seed=1, backing=path)
+
+            # a table saved with an older entry layout is refused rather than misread
+            with open(path, 'r+b') as file:
+                file.write(b'A2HTBL02')
+            with self.assertRaises(ValueError):
+                TranspositionTable(1000, backing=path)
+
+            # boards of more than 255 cells can be saved too
+            table = TranspositionTable(10)
+            table.store(12345, 2, -40, LOWER, 300)
+            table.save(path)
+            warm = TranspositionTable(10, backing=path)
+            self.assertEqual(warm.probe(12345), [2, -40, LOWER, 300])
+            warm.close()
+
+        # entries whose fields don't fit their bits are refused instead of corrupting the others
+        self.assertEqual(unpack_entry(pack_entry([255, -7, UPPER, 65534])), [255, -7, UPPER, 65534])
+        for entry in ([256, 0, EXACT, None], [-1, 0, EXACT, None], [1, 0, 4, None], [1, 0, EXACT, 65535]):
+            with self.assertRaises(ValueError):
+                pack_entry(entry)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,260 @@
+import hashlib
+from a1_partc import Queue
+from a2_parta import IntHashTable, MappedHashTable
+
+# Bound types stored with each transposition table score
+EXACT = 0  # The score is the exact minimax value of the position
+LOWER = 1  # The search failed high: the real value is at least the score
+UPPER = 2  # The search failed low: the real value is at most the score
+
+
+class ZobristHasher:
+    """
+    Zobrist hashing for game boards.
+
+    Every (cell, value) pair is given a random 64-bit key and a board hashes to the
+    XOR of the keys of its non-empty cells, plus a side key when player -1 is to move.
+    Since XOR is its own inverse, a move can update a hash by XORing out the old
+    value of a cell and XORing in the new one instead of rehashing the board.
+
+    Keys are derived from the seed, the cell index and the value, so every process
+    using the same seed gets the same hash for the same position.
+    """
+
+    def __init__(self, seed=0):
+        """
+        Args:
+        seed (int): Seed the random keys are derived from (default is 0).
+        """
+        self.seed = seed
+        self._keys = {}  # Cache of (cell index, value) -> key, filled in on first use
+        self.side_key = self._derive("side")
+
+    def _derive(self, label):
+        digest = hashlib.blake2b("{}:{}".format(self.seed, label).encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "little")
+
+    def piece_key(self, index, value):
+        """
+        Returns the key of a cell holding a value. Empty cells have key 0.
+
+        Args:
+        index (int): Row-major index of the cell.
+        value (int): Value of the cell.
+
+        Returns:
+        int: The 64-bit key of the cell.
+        """
+        if value == 0:
+            return 0
+        key = self._keys.get((index, value))
+        if key is None:
+            key = self._derive("{}:{}".format(index, value))
+            self._keys[(index, value)] = key
+        return key
+
+    def hash_board(self, board, player):
+        """
+        Computes the hash of a board from scratch.
+
+        Args:
+        board (List[List[int]]): The board to hash.
+        player (int): The player to move (1 or -1).
+
+        Returns:
+        int: The 64-bit hash of the position.
+        """
+        key = self.side_key if player == -1 else 0
+        width = len(board[0])
+        for row_i, row in enumerate(board):
+            for col_i, value in enumerate(row):
+                key ^= self.piece_key(row_i * width + col_i, value)
+        return key
+
+    def update(self, key, index, old_value, new_value):
+        """
+        Updates a hash for a single cell changing value.
+
+        Args:
+        key (int): The hash before the change.
+        index (int): Row-major index of the changed cell.
+        old_value (int): Value of the cell before the change.
+        new_value (int): Value of the cell after the change.
+
+        Returns:
+        int: The hash after the change.
+        """
+        return key ^ self.piece_key(index, old_value) ^ self.piece_key(index, new_value)
+
+
+class TranspositionTable:
+    """
+    Bounded cache of search results keyed by Zobrist hash.
+
+    Entries are [depth, score, bound, move], where move is the row-major index of the
+    best move found (None if unknown). They are kept packed into one integer each by
+    pack_entry, in an IntHashTable sized for max_entries up front, so no store stalls the
+    search on a resize. When the table is full the oldest position is evicted first
+    (FIFO), and a position that is already stored is only overwritten by a search that
+    went at least as deep.
+
+    save() writes the entries to a file that a later TranspositionTable can open
+    read-only as its backing table, e.g. to start a game with the positions of
+    earlier games. Every process opening the file shares it through mmap.
+    """
+
+    def __init__(self, max_entries=65536, seed=0, backing=None):
+        """
+        Args:
+        max_entries (int): Maximum number of positions kept (default is 65536).
+        seed (int): Seed of the Zobrist keys used to hash positions (default is 0).
+        backing (str): Path of a file written by save() with the same seed, looked up
+        when a position is not in the table (default is None).
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.seed = seed
+        self.hasher = ZobristHasher(seed)  # Positions must be hashed with this to be looked up here
+        self.backing = None
+        if backing is not None:
+            self.backing = MappedHashTable(backing)
+            if self.backing.tag != seed:
+                self.backing.close()
+                raise ValueError("{} was saved with seed {}, not {}".format(backing, self.backing.tag, seed))
+        self._table = self._new_table()
+        self._order = Queue()  # Keys in insertion order, for eviction
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def probe(self, key):
+        """
+        Looks up a position.
+
+        Args:
+        key (int): Zobrist hash of the position.
+
+        Returns:
+        List or None: The [depth, score, bound, move] entry, or None if the position is not stored.
+        """
+        packed = self._table.search(key)
+        if packed is None and self.backing is not None:
+            packed = self.backing.search(key)
+        if packed is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return unpack_entry(packed)
+
+    def store(self, key, depth, score, bound, move=None):
+        """
+        Stores the result of searching a position.
+
+        Args:
+        key (int): Zobrist hash of the position.
+        depth (int): Number of plies searched below the position.
+        score (int): Score found by the search.
+        bound (int): EXACT, LOWER or UPPER.
+        move (int): Row-major index of the best move found, if any (default is None).
+        """
+        packed = self._table.search(key)
+        if packed is not None:
+            # Keep the deeper result, it is worth more to later probes
+            if depth >= unpack_entry(packed)[0]:
+                self._table.modify(key, pack_entry([depth, score, bound, move]))
+                self.stores += 1
+            return
+        if len(self._order) >= self.max_entries:
+            self._table.remove(self._order.dequeue())
+            self.evictions += 1
+        self._table.insert(key, pack_entry([depth, score, bound, move]))
+        self._order.enqueue(key)
+        self.stores += 1
+
+    def save(self, path):
+        """
+        Writes the entries stored in the table (not those of its backing file) to a
+        file that can be passed as backing to a later TranspositionTable.
+
+        Args:
+        path (str): The file to write.
+        """
+        self._table.save(path, self.seed)
+
+    def close(self):
+        """
+        Closes the backing file, if there is one.
+        """
+        if self.backing is not None:
+            self.backing.close()
+            self.backing = None
+
+    def hit_rate(self):
+        """
+        Returns:
+        float: Fraction of probes that found their position, 0.0 before any probe.
+        """
+        probes = self.hits + self.misses
+        return self.hits / probes if probes else 0.0
+
+    def clear(self):
+        """
+        Removes every entry and resets the counters.
+        """
+        self._table = self._new_table()
+        self._order = Queue()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def _new_table(self):
+        # An empty table big enough for max_entries positions, so it never has to grow during a search
+        table = IntHashTable()
+        table.reserve(self.max_entries)
+        return table
+
+    def __len__(self):
+        """
+        Returns:
+        int: Number of positions currently stored.
+        """
+        return len(self._order)
+
+
+def pack_entry(entry):
+    """
+    Packs a [depth, score, bound, move] entry into one integer: the bound in the low 2
+    bits, the depth in the next 8, the move plus one (0 for None) in the next 16 and the
+    score above them.
+
+    Args:
+    entry (List[int]): The entry to pack. The depth must be below 256 and the move below 65535.
+
+    Returns:
+    int: The packed entry.
+
+    Raises:
+    ValueError: If the depth, bound or move doesn't fit in its bits.
+    """
+    depth, score, bound, move = entry
+    if not 0 <= depth < 256 or not 0 <= bound < 4 or not (move is None or 0 <= move < 65535):
+        raise ValueError("entry {} can't be packed".format(entry))
+    move = 0 if move is None else move + 1
+    return score << 26 | move << 10 | depth << 2 | bound
+
+
+def unpack_entry(packed):
+    """
+    Unpacks an integer made by pack_entry.
+
+    Args:
+    packed (int): The packed entry.
+
+    Returns:
+    List[int]: The [depth, score, bound, move] entry.
+    """
+    move = packed >> 10 & 65535
+    return [packed >> 2 & 255, packed >> 26, packed & 3, move - 1 if move else None]
@@ -0,0 +1,100 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from a2_partb import GameTree
+from compact_board import CompactBoard
+from transposition import TranspositionTable
+from overflow_cache import OverflowCache
+
+class TreePlayer:
+    # A bot that picks its moves with a GameTree search, for either player. PlayerOne and PlayerTwo
+    # are this bot for player 1 and player -1
+
+    def __init__(self, player, name = "Tree Bot", search = "alphabeta", tt_size = None, time_limit = None, workers = None, overflow_cache_size = None, ordering = True, reuse = True, ponder = False):
+        self.player = player  # 1 or -1
+        self.name = name
+        self.search = search
+        # Positions searched on earlier turns stay in the table, so it is kept between moves. Reusing the
+        # search and pondering both keep what they searched in it, so they need one
+        if (reuse or ponder) and not tt_size:
+            tt_size = 65536
+        self.transposition_table = TranspositionTable(tt_size) if tt_size else None
+        # Seconds per move; when set the tree deepens until the time is up instead of stopping at depth 3
+        self.time_limit = time_limit
+        # Overflows resolved by earlier searches are looked up instead of simulated again, so the cache is kept too
+        self.overflow_cache = OverflowCache(overflow_cache_size) if overflow_cache_size else None
+        # With more than one worker, the root moves are searched in parallel in a process pool
+        self.workers = workers
+        # Alpha-beta tries the most promising moves first, which prunes more without changing the move
+        self.ordering = ordering
+        # With reuse, the tree of the last move is moved on to the position the opponent's reply leads to,
+        # keeping its history table and the subtree already searched below that position
+        self.reuse = reuse
+        # With ponder, the tree keeps searching on a background thread while the opponent thinks
+        self.ponder = ponder
+        self.tree = None
+        self.ponder_thread = None
+        self.reused_depth = 0  # Plies the position of the last get_play had already been searched to
+        self.cancel_requested = False  # Set by cancel() while get_play runs on another thread
+        self.executor = None
+
+    def get_name(self):
+        return self.name
+
+    def get_executor(self):
+        # Start the process pool on first use and keep it for the rest of the game
+        if self.workers is not None and self.workers > 1 and self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self.executor
+
+    def close(self):
+        # Stop pondering and shut down the process pool, if one was started
+        self.stop_pondering()
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def start_pondering(self, board, move):
+        # Search the position our move leads to on a background thread until the opponent's move arrives
+        state = CompactBoard.from_grid(board)
+        state.make_move(state.index(*move), self.player)
+        state.overflow()
+        if state.all_same_sign():
+            return  # Our move won the game, there is nothing to ponder
+        self.tree.advance(state.to_grid(), age_history=False)  # get_play ages it when the reply arrives
+        self.ponder_thread = threading.Thread(target=self.tree.ponder, daemon=True)
+        self.ponder_thread.start()
+
+    def stop_pondering(self):
+        # Cancel the background search and wait for it to take back its moves before the tree is used again
+        if self.ponder_thread is not None:
+            self.tree.cancel()
+            self.ponder_thread.join()
+            self.ponder_thread = None
+
+    def cancel(self):
+        # Ask a get_play running on another thread to stop searching as soon as it can. It then returns
+        # the move of the deepest search that finished; the one-ply search always finishes, so there is one
+        self.cancel_requested = True
+        if self.tree is not None:
+            self.tree.cancel()
+
+    def get_play(self, board):
+        # Reset before stopping the ponder thread, so a cancel() that comes while it is joined still counts
+        self.cancel_requested = False
+        self.stop_pondering()
+        if (self.reuse or self.ponder) and self.tree is not None and len(board) == self.tree.state.rows \
+                and len(board[0]) == self.tree.state.cols:
+            self.reused_depth = self.tree.advance(board)
+        else:
+            self.reused_depth = 0
+            self.tree = GameTree(board, self.player, search=self.search, transposition_table=self.transposition_table,
+                                 time_limit=self.time_limit, executor=self.get_executor(),
+                                 overflow_cache=self.overflow_cache, ordering=self.ordering)
+        if self.cancel_requested:
+            self.tree.cancel()  # cancel() came before this move's tree was ready
+        (row,col) = self.tree.get_move()
+        if self.ponder:
+            self.start_pondering(board, (row,col))
+        elif not self.reuse:
+            self.tree = None
+        return (row,col)